@@ -4,9 +4,15 @@ Content operations for Word documents (paragraphs, tables, etc.)
 
 from docx.enum.style import WD_STYLE_TYPE
 from docx.shared import Inches
+from docx.table import Table
 import base64
 from io import BytesIO
-from mcp_docx_server.utils import load_document, get_document_path, apply_paragraph_formatting, apply_run_formatting
+from mcp_docx_server.utils import (
+    load_document, get_document_path, save_document, apply_paragraph_formatting,
+    apply_run_formatting, split_table_data, fill_table_cells, HEADING_STYLES,
+    iter_table_rows, cell_paragraph_texts, cell_has_nested_table, ensure_style_defined, body_tables,
+    body_paragraph, resolve_image_path
+)
 
 def add_paragraph(doc_id: str, text: str, style: str = None, formatting: dict = None) -> str:
     """Adds a paragraph to an existing Word document, optionally with style and formatting.
@@ -26,42 +32,19 @@ def add_paragraph(doc_id: str, text: str, style: str = None, formatting: dict =
         document = load_document(doc_id)
         result_message = "Paragraph added successfully."
         
-        # If style is specified, ensure it exists in the document
-        if style:
-            style_exists_in_doc = False
-            for doc_style in document.styles:
-                if doc_style.name == style and doc_style.type == WD_STYLE_TYPE.PARAGRAPH:
-                    style_exists_in_doc = True
-                    break
-            
-            # If style doesn't exist, it might be a built-in style that needs defining
-            if not style_exists_in_doc:
-                try:
-                    # Add temporary paragraph to define the style
-                    temp_para = document.add_paragraph("", style=style)
-                    # Remove the temporary paragraph
-                    p = temp_para._element
-                    p.getparent().remove(p)
-                except KeyError:
-                    result_message = f"Warning: Style '{style}' not found. Added without style."
-                    style = None
-        
-        # Now add the actual paragraph
-        if style:
-            try:
-                paragraph = document.add_paragraph(text, style=style)
-            except KeyError:
-                paragraph = document.add_paragraph(text)
-                result_message = f"Warning: Style '{style}' not found. Added without style."
-        else:
-            paragraph = document.add_paragraph(text)
+        # Styles that are neither defined in the document nor built in cannot be applied
+        if style and not ensure_style_defined(document, style, WD_STYLE_TYPE.PARAGRAPH):
+            result_message = f"Warning: Style '{style}' not found. Added without style."
+            style = None
+        
+        paragraph = document.add_paragraph(text, style=style)
         
         # Apply formatting if provided
         if formatting:
             apply_paragraph_formatting(paragraph, formatting)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return result_message
     except ValueError as e:
         return str(e)
@@ -84,10 +67,10 @@ def add_formatted_text(doc_id: str, paragraph_index: int, text: str, formatting:
     try:
         document = load_document(doc_id)
         
-        if paragraph_index < 0 or paragraph_index >= len(document.paragraphs):
+        paragraph = body_paragraph(document, paragraph_index)
+        if paragraph is None:
             return "Error: Paragraph index out of range."
         
-        paragraph = document.paragraphs[paragraph_index]
         run = paragraph.add_run(text)
         
         # Apply formatting if provided
@@ -95,7 +78,7 @@ def add_formatted_text(doc_id: str, paragraph_index: int, text: str, formatting:
             apply_run_formatting(run, formatting)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return "Formatted text added successfully."
     except ValueError as e:
         return str(e)
@@ -103,19 +86,62 @@ def add_formatted_text(doc_id: str, paragraph_index: int, text: str, formatting:
         return f"Error adding formatted text: {str(e)}"
 
 def add_image(doc_id: str, image_data: str, image_name: str, width_inches: float = 6.0) -> str:
-    """Adds an image to an existing Word document."""
+    """Adds an image to an existing Word document.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+        image_data (str): Base64-encoded image data, or the path of an image file in the
+            documents directory (optionally as a file:// URL). Relative paths are taken
+            from the documents directory.
+        image_name (str): Name of the image, only used in the status message.
+        width_inches (float): Width of the image in inches.
+    """
+    try:
+        if not image_data:
+            return "Error: No image data provided."
+        # File paths are handed to python-docx, which reads the file itself, so the
+        # image is never held as a base64 string and a decoded copy at the same time
+        image_path = resolve_image_path(image_data)
+        if image_path is not None:
+            return _add_picture(doc_id, image_path, image_name, width_inches)
+        image_bytes = base64.b64decode(image_data, validate=False)
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error adding image: {str(e)}"
+    return add_image_bytes(doc_id, image_bytes, image_name, width_inches)
+
+def add_image_bytes(doc_id: str, image_bytes: bytes, image_name: str, width_inches: float = 6.0) -> str:
+    """Adds an image given as raw bytes to an existing Word document.
+    
+    For Python callers that already hold the image data; MCP clients use add_image()
+    with base64 data instead.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+        image_bytes (bytes): The image file contents.
+        image_name (str): Name of the image, only used in the status message.
+        width_inches (float): Width of the image in inches.
+    """
+    # BytesIO shares the buffer instead of copying it, and is released once the
+    # picture part holds the image so it doesn't outlive the save
+    with BytesIO(image_bytes) as image_stream:
+        return _add_picture(doc_id, image_stream, image_name, width_inches)
+
+def _add_picture(doc_id: str, image, image_name: str, width_inches: float) -> str:
+    """Adds an image file path or stream to a document and saves it."""
     try:
         document = load_document(doc_id)
-        image_bytes = base64.b64decode(image_data)
-        image_stream = BytesIO(image_bytes)
-        document.add_picture(image_stream, width=Inches(width_inches))
+        document.add_picture(image, width=Inches(width_inches))
+        
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Image '{image_name}' added to document '{doc_id}.docx' successfully."
     except ValueError as e:
         return str(e)
     except Exception as e:
-        return f"Error adding image: {str(e)}"
+        # python-docx raises UnrecognizedImageError without a message
+        return f"Error adding image: {str(e) or type(e).__name__}"
 
 def add_heading(doc_id: str, text: str, level: int, formatting: dict = None) -> str:
     """Adds a heading to an existing Word document with optional formatting.
@@ -129,31 +155,12 @@ def add_heading(doc_id: str, text: str, level: int, formatting: dict = None) ->
     try:
         document = load_document(doc_id)
         
-        # First, ensure the heading style exists in the document
-        heading_style = None
-        if level == 0:
-            heading_style = "Title"
-        else:
-            heading_style = f"Heading {level}"
-        
-        # Check if this heading style exists in the document
-        style_exists_in_doc = False
-        for doc_style in document.styles:
-            if doc_style.name == heading_style:
-                style_exists_in_doc = True
-                break
-        
-        # If style doesn't exist, it needs to be defined first
-        if not style_exists_in_doc:
-            try:
-                # Add temporary paragraph to define the style
-                temp_para = document.add_paragraph("", style=heading_style)
-                # Remove the temporary paragraph
-                p = temp_para._element
-                p.getparent().remove(p)
-            except KeyError:
-                # If the style is not found, it's not a built-in style
-                pass
+        # The heading style must be defined in the document or be a built-in style
+        # that can be defined now; report it instead of letting add_heading raise
+        # KeyError (an invalid level has no style and is rejected by add_heading below)
+        heading_style = HEADING_STYLES.get(level)
+        if heading_style is not None and not ensure_style_defined(document, heading_style, WD_STYLE_TYPE.PARAGRAPH):
+            return f"Error adding heading: Style '{heading_style}' is not defined in the document."
         
         # Now add the actual heading
         heading = document.add_heading(text, level)
@@ -163,7 +170,7 @@ def add_heading(doc_id: str, text: str, level: int, formatting: dict = None) ->
             apply_paragraph_formatting(heading, formatting)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return "Heading added successfully."
     except ValueError as e:
         return str(e)
@@ -177,31 +184,17 @@ def add_table(doc_id: str, rows: int, cols: int, data: str = None, style: str =
         doc_id (str): The document ID (filename without extension).
         rows (int): The number of rows in the table.
         cols (int): The number of columns in the table.
-        data (str, optional): Comma-separated data for the table cells (row-wise).
+        data (str, optional): Comma-separated data for the table cells (row-wise). Line
+                              breaks separate values like commas. Put double quotes
+                              around values that contain commas or line breaks.
         style (str, optional): Table style (e.g., "Table Grid", "Light Shading").
     """
     try:
         document = load_document(doc_id)
         
-        # If style is specified, ensure it exists in the document
-        if style:
-            style_exists_in_doc = False
-            for doc_style in document.styles:
-                if doc_style.name == style and doc_style.type == WD_STYLE_TYPE.TABLE:
-                    style_exists_in_doc = True
-                    break
-            
-            # If style doesn't exist, it might be a built-in style that needs defining
-            if not style_exists_in_doc:
-                try:
-                    # Add temporary table to define the style
-                    temp_table = document.add_table(rows=1, cols=1)
-                    temp_table.style = style
-                    # Remove the temporary table
-                    p = temp_table._element
-                    p.getparent().remove(p)
-                except KeyError:
-                    return f"Warning: Table style '{style}' not found. Table will be added with default style."
+        # Styles that are neither defined in the document nor built in cannot be applied
+        if style and not ensure_style_defined(document, style, WD_STYLE_TYPE.TABLE):
+            return f"Warning: Table style '{style}' not found. Table will be added with default style."
         
         # Create table with specified dimensions
         table = document.add_table(rows=rows, cols=cols)
@@ -215,25 +208,17 @@ def add_table(doc_id: str, rows: int, cols: int, data: str = None, style: str =
         
         # Fill with data if provided
         if data:
-            data_list = data.split(',')
+            data_list = split_table_data(data)
             
-            # Check if data matches table dimensions
+            # Check if data matches table dimensions (missing cells are left empty)
             if len(data_list) > rows * cols:
                 return f"Error: Number of data elements ({len(data_list)}) exceeds table dimensions ({rows}x{cols})."
                 
-            # Pad with empty strings if too few data elements
-            if len(data_list) < rows * cols:
-                data_list.extend([''] * (rows * cols - len(data_list)))
-                
             # Fill table cells
-            for i in range(rows):
-                for j in range(cols):
-                    cell_idx = i * cols + j
-                    if cell_idx < len(data_list):
-                        table.cell(i, j).text = data_list[cell_idx].strip()
+            fill_table_cells(table, data_list)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Table with {rows} rows and {cols} columns added successfully."
     except ValueError as e:
         return str(e)
@@ -255,10 +240,11 @@ def merge_table_cells(doc_id: str, table_index: int, start_row: int, start_col:
         document = load_document(doc_id)
         
         # Check if document has tables
-        if not document.tables or len(document.tables) <= table_index:
-            return f"Error: Table index {table_index} is out of range. Document has {len(document.tables) if document.tables else 0} tables."
+        tables = body_tables(document)
+        if len(tables) <= table_index:
+            return f"Error: Table index {table_index} is out of range. Document has {len(tables)} tables."
         
-        table = document.tables[table_index]
+        table = Table(tables[table_index], document._body)
         
         # Validate row and column indices
         if start_row < 0 or end_row >= len(table.rows) or start_col < 0:
@@ -274,7 +260,7 @@ def merge_table_cells(doc_id: str, table_index: int, start_row: int, start_col:
         first_cell.merge(last_cell)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Cells merged from ({start_row},{start_col}) to ({end_row},{end_col}) in table {table_index}."
     except ValueError as e:
         return str(e)
@@ -290,42 +276,41 @@ def get_table_data(doc_id: str, table_index: int, include_empty_cells: bool = Tr
         include_empty_cells (bool): Whether to include empty cells in the output.
     """
     try:
-        document = load_document(doc_id)
+        document = load_document(doc_id, read_only=True)
         
         # Check if document has tables
-        if not document.tables or len(document.tables) <= table_index:
-            return f"Error: Table index {table_index} is out of range. Document has {len(document.tables) if document.tables else 0} tables."
+        tables = body_tables(document)
+        if len(tables) <= table_index:
+            return f"Error: Table index {table_index} is out of range. Document has {len(tables)} tables."
         
-        table = document.tables[table_index]
-        
-        # Get table data
+        # Get table data straight from the table XML
         result = []
-        for i, row in enumerate(table.rows):
+        for grid_cols_before, cells, grid_cols_after in iter_table_rows(tables[table_index]):
             row_data = []
             
             # Handle cells before the first actual cell
-            for _ in range(row.grid_cols_before):
-                if include_empty_cells:
-                    row_data.append("")
+            if include_empty_cells:
+                row_data.extend([""] * grid_cols_before)
             
-            # Handle actual cells
-            for cell in row.cells:
-                # Get all text from the cell, including from nested tables
-                cell_text = []
-                for paragraph in cell.paragraphs:
-                    if paragraph.text.strip() or include_empty_cells:
-                        cell_text.append(paragraph.text)
-                
-                # Add nested tables as a note
-                if cell.tables:
-                    cell_text.append("[Contains nested table]")
-                
-                row_data.append("\n".join(cell_text))
+            # Handle actual cells; a spanned cell appears once per grid column, so
+            # its text is only extracted the first time
+            cell_texts = {}
+            for tc in cells:
+                if tc not in cell_texts:
+                    # Get all text from the cell, including from nested tables
+                    cell_text = [text for text in cell_paragraph_texts(tc)
+                                 if include_empty_cells or text.strip()]
+                    
+                    # Add nested tables as a note
+                    if cell_has_nested_table(tc):
+                        cell_text.append("[Contains nested table]")
+                    
+                    cell_texts[tc] = "\n".join(cell_text)
+                row_data.append(cell_texts[tc])
             
             # Handle cells after the last actual cell
-            for _ in range(row.grid_cols_after):
-                if include_empty_cells:
-                    row_data.append("")
+            if include_empty_cells:
+                row_data.extend([""] * grid_cols_after)
             
             result.append(" | ".join(row_data))
         
@@ -342,28 +327,32 @@ def list_tables(doc_id: str) -> str:
         doc_id (str): The document ID (filename without extension).
     """
     try:
-        document = load_document(doc_id)
+        document = load_document(doc_id, read_only=True)
         
-        if not document.tables:
+        tables = body_tables(document)
+        if not tables:
             return f"No tables found in document '{doc_id}.docx'."
         
         tables_info = []
-        for i, table in enumerate(document.tables):
-            row_count = len(table.rows)
+        for i, tbl in enumerate(tables):
+            table = Table(tbl, document._body)
+            # Read the row layout straight from the table XML
+            table_rows = list(iter_table_rows(tbl))
+            row_count = len(table_rows)
             # Get the maximum number of columns across all rows
-            col_count = max([row.grid_cols_before + len(row.cells) + row.grid_cols_after 
-                            for row in table.rows]) if row_count > 0 else 0
+            col_count = max(grid_cols_before + len(cells) + grid_cols_after
+                            for grid_cols_before, cells, grid_cols_after in table_rows) if row_count > 0 else 0
             
             first_cell_text = ""
-            if row_count > 0 and len(table.rows[0].cells) > 0:
-                first_cell_text = table.rows[0].cells[0].text[:30]
-                if len(table.rows[0].cells[0].text) > 30:
+            if row_count > 0 and table_rows[0][1]:
+                cell_text = "\n".join(cell_paragraph_texts(table_rows[0][1][0]))
+                first_cell_text = cell_text[:30]
+                if len(cell_text) > 30:
                     first_cell_text += "..."
             
-            # Get table style if available
-            style_name = "Default"
-            if hasattr(table, "style") and table.style:
-                style_name = table.style.name
+            # Get table style; resolving it looks the style up, so read it only once
+            style = table.style
+            style_name = style.name if style is not None else "Default"
             
             tables_info.append(f"Table {i}: {row_count} rows x {col_count} columns. Style: '{style_name}'. First cell: '{first_cell_text}'")
         
@@ -386,17 +375,21 @@ def set_paragraph_properties(doc_id: str, paragraph_index: int, formatting: dict
             - line_spacing: Line spacing as multiple or points
             - keep_together, keep_with_next, page_break_before, widow_control: Boolean pagination options
     """
+    # Nothing to change, so skip loading and re-saving the document
+    if not formatting:
+        return "No paragraph properties specified; document left unchanged."
+    
     try:
         document = load_document(doc_id)
         
-        if paragraph_index < 0 or paragraph_index >= len(document.paragraphs):
+        paragraph = body_paragraph(document, paragraph_index)
+        if paragraph is None:
             return "Error: Paragraph index out of range."
         
-        paragraph = document.paragraphs[paragraph_index]
         apply_paragraph_formatting(paragraph, formatting)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Paragraph {paragraph_index} properties set successfully."
     except ValueError as e:
         return str(e)
@@ -416,13 +409,16 @@ def set_text_properties(doc_id: str, paragraph_index: int, run_index: int, forma
             - bold, italic, underline: Boolean style options
             - color: Color as hex (#RRGGBB) or rgb(r,g,b)
     """
+    if not formatting:
+        return "No text properties specified; document left unchanged."
+    
     try:
         document = load_document(doc_id)
         
-        if paragraph_index < 0 or paragraph_index >= len(document.paragraphs):
+        paragraph = body_paragraph(document, paragraph_index)
+        if paragraph is None:
             return "Error: Paragraph index out of range."
         
-        paragraph = document.paragraphs[paragraph_index]
         
         if run_index < 0 or run_index >= len(paragraph.runs):
             return f"Error: Run index {run_index} is out of range. Paragraph has {len(paragraph.runs)} runs."
@@ -431,7 +427,7 @@ def set_text_properties(doc_id: str, paragraph_index: int, run_index: int, forma
         apply_run_formatting(run, formatting)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Text properties set for run {run_index} in paragraph {paragraph_index}."
     except ValueError as e:
         return str(e)
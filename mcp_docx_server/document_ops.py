@@ -2,9 +2,33 @@
 Document creation and content management operations.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from docx import Document
+import base64
 import os
-from mcp_docx_server.utils import get_document_path, load_document, add_content_to_document
+import shutil
+import subprocess
+import tempfile
+import time
+import zipfile
+from mcp_docx_server.utils import (
+    DOCUMENTS_DIR, get_document_path, load_document, save_document, add_content_to_document,
+    iter_paragraph_texts, count_paragraphs, flush_pending_saves, pop_save_errors,
+    iter_document_structure, cell_paragraph_texts, open_document_session, close_document_session,
+    DocumentNotFoundError
+)
+
+def _read_worker_count() -> int:
+    """Returns DOCX_WORKERS if it is set to a positive integer, else one worker per CPU."""
+    try:
+        workers = int(os.environ.get("DOCX_WORKERS", ""))
+    except ValueError:
+        workers = 0
+    return workers if workers > 0 else os.cpu_count() or 4
+
+# Worker threads for reading several documents at once; DOCX_WORKERS overrides the
+# default of one per CPU. Threads are started on first use.
+_READ_EXECUTOR = ThreadPoolExecutor(max_workers=_read_worker_count(), thread_name_prefix="docx-read")
 
 def create_document(doc_id: str, title: str = "New Document") -> str:
     """Creates a new Word document with a title."""
@@ -12,8 +36,8 @@ def create_document(doc_id: str, title: str = "New Document") -> str:
         document = Document()
         document.add_heading(title, 0)
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
-        return f"Document '{doc_id}.docx' created successfully at path: {os.path.abspath(doc_path)}"
+        save_document(document, doc_path, defer=False)
+        return f"Document '{doc_id}.docx' created successfully at path: {os.path.normpath(doc_path)}"
     except Exception as e:
         return f"Error creating document: {str(e)}"
 
@@ -27,9 +51,9 @@ def create_complete_document(doc_id: str, title: str = "New Document", content:
             return "Error in table data: Number of data elements does not match table dimensions."
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path, defer=False)
         
-        return f"Document '{doc_id}.docx' created successfully with title and {len(content) if content else 0} content items at path: {os.path.abspath(doc_path)}"
+        return f"Document '{doc_id}.docx' created successfully with title and {len(content) if content else 0} content items at path: {os.path.normpath(doc_path)}"
     except Exception as e:
         return f"Error creating document: {str(e)}"
 
@@ -38,22 +62,25 @@ def update_document(doc_id: str, title: str = None, content: list = None, append
     try:
         doc_path = get_document_path(doc_id)
         
-        if not os.path.exists(doc_path) and append:
-            return f"Document '{doc_id}.docx' does not exist and cannot be updated. Create it first."
-        
-        if not append or not os.path.exists(doc_path):
-            document = Document()
+        if append:
+            # load_document serves a document with a pending save from memory, so
+            # appending in a burst or in an open session never re-reads the file
+            try:
+                document = load_document(doc_id)
+            except DocumentNotFoundError:
+                return f"Document '{doc_id}.docx' does not exist and cannot be updated. Create it first."
             if title:
-                document.add_heading(title, 0)
+                document.add_heading(title, 1)
         else:
-            document = Document(doc_path)
+            document = Document()
             if title:
-                document.add_heading(title, 1)
+                document.add_heading(title, 0)
         
         if not add_content_to_document(document, content):
             return "Error in table data: Number of data elements does not match table dimensions."
         
-        document.save(doc_path)
+        # A replacement is written straight away, like a newly created document
+        save_document(document, doc_path, defer=append)
         
         action = "updated by appending" if append else "replaced"
         title_msg = f" with new title" if title else ""
@@ -74,33 +101,144 @@ def replace_document(doc_id: str, title: str = None, content: list = None) -> st
 def read_document(doc_id: str) -> str:
     """Reads the entire content of a Word document."""
     try:
-        document = load_document(doc_id)
-        full_text = [paragraph.text for paragraph in document.paragraphs]
-        return '\n'.join(full_text)
+        # Paragraphs are streamed, so only the text is held in memory, never the XML tree
+        return '\n'.join(iter_paragraph_texts(doc_id))
     except ValueError as e:
         return str(e)
     except Exception as e:
         return f"Unexpected error: {str(e)}"
 
-def check_document_exists(doc_id: str) -> str:
-    """Checks if a Word document exists and can be read."""
-    doc_path = get_document_path(doc_id)
+def read_documents(doc_ids: list) -> dict:
+    """Reads the entire content of several Word documents in parallel.
+    
+    Each document is read on a worker thread, so unzipping and parsing overlap.
+    
+    Args:
+        doc_ids (list): The document IDs (filenames without extension) to read.
+    
+    Returns:
+        dict: The content of each document, or its error message, keyed by document ID.
+    """
+    doc_ids = list(dict.fromkeys(doc_ids or []))
+    return dict(zip(doc_ids, _READ_EXECUTOR.map(read_document, doc_ids)))
+
+def read_document_chunk(doc_id: str, offset: int = 0, max_chars: int = 65536) -> dict:
+    """Reads part of a Word document, for incremental reading of large documents.
+    
+    Paragraphs are returned starting at `offset` until adding another would exceed
+    `max_chars`. At least one paragraph is always returned unless the end is reached.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+        offset (int): Index of the first paragraph to read (0-based).
+        max_chars (int): Approximate maximum number of characters to return.
+    
+    Returns:
+        dict: "text" with the paragraphs read, "next_offset" with the offset to pass
+        to read the next chunk, and "eof" which is True once the whole document is read.
+    """
+    if offset < 0:
+        return {"error": "Error: Offset must not be negative."}
+    
     try:
-        if os.path.exists(doc_path):
-            document = Document(doc_path)
-            paragraph_count = len(document.paragraphs)
-            return f"Document '{doc_id}.docx' exists and is readable at path: {os.path.abspath(doc_path)}. Contains {paragraph_count} paragraphs."
-        else:
-            return f"Document '{doc_id}.docx' does not exist at path: {os.path.abspath(doc_path)}"
+        chunk = []
+        chunk_size = 0
+        eof = True
+        for text in iter_paragraph_texts(doc_id, offset):
+            if chunk and chunk_size + len(text) > max_chars:
+                eof = False
+                break
+            chunk.append(text)
+            chunk_size += len(text) + 1  # Account for the joining newline
+        
+        return {"text": "\n".join(chunk), "next_offset": offset + len(chunk), "eof": eof}
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Unexpected error: {str(e)}"}
+
+def read_paragraphs_range(doc_id: str, start: int, end: int) -> str:
+    """Reads a range of paragraphs from a Word document.
+    
+    Only the part of the document up to paragraph `end` is parsed, which makes this
+    much cheaper than read_document() for a slice near the start of a large document.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+        start (int): Index of the first paragraph to read (0-based).
+        end (int): Index of the paragraph to stop before (exclusive).
+    """
+    if start < 0 or end < start:
+        return "Error: Invalid paragraph range."
+    
+    try:
+        return '\n'.join(iter_paragraph_texts(doc_id, start, end))
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Unexpected error: {str(e)}"
+
+def check_document_exists(doc_id: str, include_stats: bool = False) -> str:
+    """Checks if a Word document exists and can be read.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+        include_stats (bool): Whether to parse the document and report its paragraph count.
+    """
+    try:
+        doc_path = get_document_path(doc_id)
+    except ValueError as e:
+        return str(e)
+    
+    try:
+        flush_pending_saves(doc_path)
+        if not os.path.exists(doc_path):
+            return f"Document '{doc_id}.docx' does not exist at path: {os.path.normpath(doc_path)}"
+        
+        # A .docx file is a ZIP package; checking its signature avoids parsing the document
+        if not zipfile.is_zipfile(doc_path):
+            return f"Document '{doc_id}.docx' exists but cannot be read: File is not a valid .docx package."
+        
+        file_size = os.stat(doc_path).st_size
+        result = f"Document '{doc_id}.docx' exists and is readable at path: {os.path.normpath(doc_path)}. Size: {file_size} bytes."
+        if include_stats:
+            paragraph_count = count_paragraphs(doc_id)
+            result += f" Contains {paragraph_count} paragraphs."
+        return result
     except Exception as e:
         return f"Document '{doc_id}.docx' exists but cannot be read: {str(e)}"
 
+# Last listing of the documents directory, keyed by directory, with the directory
+# mtime it was read at
+_DOCUMENT_LIST_CACHE = {}
+
+def _list_document_ids() -> list:
+    """Returns the sorted IDs of the .docx files in the documents directory.
+    
+    Adding, removing or renaming a file updates the directory mtime, so the last
+    listing is reused while that is unchanged. A listing taken within two seconds of
+    the last change is not reused, as a further change in the same timestamp tick
+    would leave the mtime as it is.
+    """
+    mtime_ns = os.stat(DOCUMENTS_DIR).st_mtime_ns
+    cached = _DOCUMENT_LIST_CACHE.get(DOCUMENTS_DIR)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    
+    with os.scandir(DOCUMENTS_DIR) as entries:
+        docx_files = [entry.name[:-5] for entry in entries
+                      if entry.name.endswith('.docx') and entry.is_file()]
+    docx_files.sort()
+    
+    if time.time_ns() - mtime_ns > 2_000_000_000:
+        _DOCUMENT_LIST_CACHE[DOCUMENTS_DIR] = (mtime_ns, docx_files)
+    return docx_files
+
 def list_available_documents() -> str:
     """Lists all Word documents (.docx files) available in the server directory."""
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(script_dir)  # Go up one level to the project root
-        docx_files = [f.replace('.docx', '') for f in os.listdir(parent_dir) if f.endswith('.docx')]
+        flush_pending_saves()
+        docx_files = _list_document_ids()
         
         if not docx_files:
             return "No Word documents (.docx files) found in the server directory."
@@ -110,25 +248,261 @@ def list_available_documents() -> str:
     except Exception as e:
         return f"Error listing documents: {str(e)}"
 
-def convert_to_pdf(doc_id: str) -> str:
-    """Converts a Word document to PDF format."""
+# Maximum number of characters of LibreOffice's error output included in error messages
+_SOFFICE_ERROR_LIMIT = 1000
+
+def _pdf_mtime(pdf_path: str):
+    """Returns the modification time of a PDF file, or None if it does not exist."""
     try:
+        return os.stat(pdf_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _convert_to_pdf_files(doc_paths: list, output_dir: str) -> None:
+    """Converts .docx files to PDFs with the same base names in output_dir.
+    
+    LibreOffice is used in headless mode when soffice is on the PATH, converting all
+    files in a single process. Otherwise docx2pdf is used, which drives Microsoft Word.
+    LibreOffice can exit successfully without converting anything, for example when
+    it cannot load a file, so every PDF is checked afterwards. A RuntimeError naming
+    the PDFs that were not written, with LibreOffice's error output, is raised on failure.
+    """
+    pdf_paths = [os.path.join(output_dir, os.path.basename(doc_path)[:-len(".docx")] + ".pdf")
+                 for doc_path in doc_paths]
+    # An existing PDF from an earlier conversion only counts if it gets rewritten
+    old_mtimes = [_pdf_mtime(pdf_path) for pdf_path in pdf_paths]
+    
+    stderr = ""
+    soffice = shutil.which("soffice")
+    if soffice:
+        result = subprocess.run([soffice, "--headless", "--convert-to", "pdf", "--outdir", output_dir, *doc_paths],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = _truncate(result.stderr.decode(errors="replace").strip(), _SOFFICE_ERROR_LIMIT)
+        if result.returncode != 0:
+            raise RuntimeError(f"LibreOffice exited with status {result.returncode}: "
+                               f"{stderr or 'no error output'}")
+    else:
         from docx2pdf import convert
         
+        if len(doc_paths) == 1:
+            convert(doc_paths[0], pdf_paths[0])
+        else:
+            # Converting a directory lets docx2pdf start Word only once for the whole batch
+            with tempfile.TemporaryDirectory() as batch_dir:
+                for doc_path in doc_paths:
+                    shutil.copy2(doc_path, batch_dir)
+                convert(batch_dir, output_dir)
+    
+    missing = [os.path.basename(pdf_path) for pdf_path, old_mtime in zip(pdf_paths, old_mtimes)
+               if _pdf_mtime(pdf_path) in (None, old_mtime)]
+    if missing:
+        message = f"PDF not written for: {', '.join(missing)}"
+        raise RuntimeError(f"{message}. LibreOffice output: {stderr}" if stderr else message)
+
+def convert_to_pdf(doc_id: str) -> str:
+    """Converts a Word document to PDF format."""
+    try:
         doc_path = get_document_path(doc_id)
+        flush_pending_saves(doc_path)
         if not os.path.exists(doc_path):
             return f"Error: Document '{doc_id}.docx' not found."
         
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(script_dir)  # Go up one level to the project root
-        pdf_path = os.path.join(parent_dir, f"{doc_id}.pdf")
+        # Document paths are already absolute, so the PDF path needs no resolving
+        pdf_path = doc_path[:-len(".docx")] + ".pdf"
         
-        convert(doc_path, pdf_path)
+        _convert_to_pdf_files([doc_path], os.path.dirname(doc_path))
         
-        return f"Document successfully converted to PDF at: {os.path.abspath(pdf_path)}"
+        return f"Document successfully converted to PDF at: {pdf_path}"
     except Exception as e:
         return f"Error converting document to PDF: {str(e)}"
 
+def convert_to_pdf_bytes(doc_id: str) -> dict:
+    """Converts a Word document to PDF and returns the PDF as base64-encoded data.
+    
+    The PDF is written to a temporary directory and returned directly, so no
+    PDF file is left in the server directory.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+    
+    Returns:
+        dict: The PDF under "pdf_base64", or an "error" message if the conversion failed.
+    """
+    try:
+        doc_path = get_document_path(doc_id)
+        flush_pending_saves(doc_path)
+        if not os.path.exists(doc_path):
+            return {"error": f"Error: Document '{doc_id}.docx' not found."}
+        
+        with tempfile.TemporaryDirectory() as output_dir:
+            _convert_to_pdf_files([doc_path], output_dir)
+            pdf_path = os.path.join(output_dir, os.path.basename(doc_path)[:-len(".docx")] + ".pdf")
+            with open(pdf_path, "rb") as f:
+                return {"pdf_base64": base64.b64encode(f.read()).decode("ascii")}
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"Error converting document to PDF: {str(e)}"}
+
+def convert_many_to_pdf(doc_ids: list) -> str:
+    """Converts several Word documents to PDF format in a single batch.
+    
+    The documents are converted together so LibreOffice or Word is started only
+    once for the whole batch rather than once per document.
+    
+    Args:
+        doc_ids (list): The document IDs (filenames without extension) to convert.
+    """
+    try:
+        if not doc_ids:
+            return "Error: No documents specified for conversion."
+        
+        flush_pending_saves()
+        doc_paths = [get_document_path(doc_id) for doc_id in doc_ids]
+        missing = [doc_id for doc_id, doc_path in zip(doc_ids, doc_paths) if not os.path.exists(doc_path)]
+        if missing:
+            return f"Error: Document(s) not found: {', '.join(doc_id + '.docx' for doc_id in missing)}"
+        
+        _convert_to_pdf_files(doc_paths, DOCUMENTS_DIR)
+        
+        pdf_list = "\n".join(f"- {os.path.join(DOCUMENTS_DIR, doc_id + '.pdf')}" for doc_id in doc_ids)
+        return f"{len(doc_ids)} documents successfully converted to PDF:\n{pdf_list}"
+    except Exception as e:
+        return f"Error converting documents to PDF: {str(e)}"
+
+def flush_document_changes() -> str:
+    """Writes document changes that are waiting to be saved to disk immediately.
+    
+    Edits are saved automatically shortly after they are made. Call this before
+    opening a document in another application straight after editing it.
+    """
+    try:
+        count = flush_pending_saves()
+        errors = pop_save_errors()
+        if errors:
+            failed = "; ".join(f"{os.path.basename(doc_path)}: {error}" for doc_path, error in errors.items())
+            return f"Error saving document changes: Saved {count} document(s), failed to save {failed}"
+        if not count:
+            return "No pending document changes to save."
+        return f"Saved pending changes to {count} document(s)."
+    except Exception as e:
+        return f"Error saving document changes: {str(e)}"
+
+def open_document(doc_id: str) -> str:
+    """Starts an editing session that keeps a document's changes in memory.
+    
+    Until close_document() is called, edits are not written to disk after each tool
+    call, so a long series of edits costs a single write. Reading the document
+    still sees every change, and a tool call that fails leaves no partial changes.
+    The edits exist only in the server's memory until close_document() or
+    flush_document_changes() writes them; if the server is killed or crashes first,
+    they are lost.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+    """
+    try:
+        if not open_document_session(doc_id):
+            return f"Document '{doc_id}.docx' is already open."
+        return (f"Document '{doc_id}.docx' opened. Changes are kept in memory until close_document is called "
+                f"and are lost if the server stops before then.")
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error opening document: {str(e)}"
+
+def close_document(doc_id: str) -> str:
+    """Ends an editing session started with open_document() and saves the document.
+    
+    Args:
+        doc_id (str): The document ID (filename without extension).
+    """
+    try:
+        if not close_document_session(doc_id):
+            return f"Document '{doc_id}.docx' is not open."
+        return f"Document '{doc_id}.docx' closed and saved."
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error closing document: {str(e)}"
+
+# Labels for the tri-state run.bold / run.italic values; None means inherited from the style
+_BOLD_LABELS = {True: "Bold", False: "Normal", None: "Inherit"}
+_ITALIC_LABELS = {True: "Italic", False: "Normal", None: "Inherit"}
+
+def _truncate(text: str, limit: int) -> str:
+    """Returns text cut to `limit` characters, with "..." appended if it was cut."""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _iter_structure_lines(doc_id: str):
+    """Yields the lines of the structure analysis report for a document.
+    
+    The document body is streamed once; paragraph and table details are collected
+    separately because the report lists all paragraphs before the tables.
+    """
+    paragraph_lines = []
+    table_lines = []
+    paragraph_count = 0
+    table_count = 0
+    
+    for item in iter_document_structure(doc_id):
+        if item[0] == "paragraph":
+            _, text, style, runs = item
+            i = paragraph_count
+            paragraph_count += 1
+            
+            if not text.strip():
+                paragraph_lines.append(f"  Paragraph {i}: [Empty paragraph]")
+                continue
+            
+            paragraph_lines.append(f"  Paragraph {i}: Style='{style}', Runs={len(runs)}\n"
+                                   f"    Text: \"{_truncate(text, 50)}\"")
+            
+            if runs:
+                paragraph_lines.append(f"    Run details:")
+                for j, (style_name, bold, italic, run_text) in enumerate(runs):
+                    paragraph_lines.append(f"      Run {j}: Style='{style_name}', {_BOLD_LABELS[bold]}, "
+                                           f"{_ITALIC_LABELS[italic]}, Text=\"{_truncate(run_text, 30)}\"")
+        else:
+            _, style_name, table_rows = item
+            i = table_count
+            table_count += 1
+            
+            row_count = len(table_rows)
+            col_count = max(grid_cols_before + len(cells) + grid_cols_after
+                            for grid_cols_before, cells, grid_cols_after in table_rows) if row_count > 0 else 0
+            
+            table_lines.append(f"  Table {i}: {row_count} rows x {col_count} columns\n"
+                               f"    Style: {style_name}")
+            
+            # Show a preview of the first few cells
+            preview_rows = table_rows[:3]
+            if preview_rows and preview_rows[0][1]:
+                table_lines.append(f"    Preview:")
+                for r, (_, cells, _) in enumerate(preview_rows):
+                    cell_texts = []
+                    for tc in cells[:3]:
+                        cell_text = _truncate("\n".join(cell_paragraph_texts(tc)), 20)
+                        cell_texts.append(f"\"{cell_text}\"")
+                    
+                    additional = "..." if len(cells) > 3 else ""
+                    table_lines.append(f"      Row {r}: {', '.join(cell_texts)}{additional}")
+    
+    yield f"Document Structure Analysis for '{doc_id}.docx':"
+    yield f"Total paragraphs: {paragraph_count}"
+    yield f"Total tables: {table_count}"
+    yield "\nParagraph Details:"
+    yield from paragraph_lines
+    
+    if table_count:
+        yield "\nTable Details:"
+        yield from table_lines
+
+# Structure reports keyed by document path together with the file version they
+# describe, oldest first. Bounded to the most recently analyzed documents.
+_STRUCTURE_CACHE = {}
+_STRUCTURE_CACHE_SIZE = 64
+
 def analyze_document_structure(doc_id: str) -> str:
     """Analyzes the structure of a document, showing paragraphs, runs, and tables.
     
@@ -140,61 +514,25 @@ def analyze_document_structure(doc_id: str) -> str:
         doc_id (str): The document ID (filename without extension).
     """
     try:
-        document = load_document(doc_id)
+        # Reuse the last report while the file is unchanged; the version is read
+        # after flushing so unsaved edits are never reported stale
+        doc_path = get_document_path(doc_id)
+        flush_pending_saves(doc_path)
+        file_version = None
+        if os.path.exists(doc_path):
+            stat = os.stat(doc_path)
+            file_version = (stat.st_mtime_ns, stat.st_size)
+            cached = _STRUCTURE_CACHE.get(doc_path)
+            if cached is not None and cached[0] == file_version:
+                return cached[1]
         
-        structure = []
-        structure.append(f"Document Structure Analysis for '{doc_id}.docx':")
-        structure.append(f"Total paragraphs: {len(document.paragraphs)}")
-        structure.append(f"Total tables: {len(document.tables)}")
-        structure.append("\nParagraph Details:")
+        report = "\n".join(_iter_structure_lines(doc_id))
         
-        for i, para in enumerate(document.paragraphs):
-            if not para.text.strip():
-                structure.append(f"  Paragraph {i}: [Empty paragraph]")
-                continue
-                
-            style = para.style.name if para.style else "Default"
-            run_count = len(para.runs)
-            structure.append(f"  Paragraph {i}: Style='{style}', Runs={run_count}")
-            structure.append(f"    Text: \"{para.text[:50]}{'...' if len(para.text) > 50 else ''}\"")
-            
-            if run_count > 0:
-                structure.append(f"    Run details:")
-                for j, run in enumerate(para.runs):
-                    bold = "Bold" if run.bold else "Normal"
-                    italic = "Italic" if run.italic else "Normal"
-                    style_name = run.style.name if run.style else "Default"
-                    structure.append(f"      Run {j}: Style='{style_name}', {bold}, {italic}, Text=\"{run.text[:30]}{'...' if len(run.text) > 30 else ''}\"")
-        
-        if document.tables:
-            structure.append("\nTable Details:")
-            for i, table in enumerate(document.tables):
-                row_count = len(table.rows)
-                col_count = max([row.grid_cols_before + len(row.cells) + row.grid_cols_after 
-                                for row in table.rows]) if row_count > 0 else 0
-                
-                style_name = table.style.name if table.style else "Default"
-                
-                structure.append(f"  Table {i}: {row_count} rows x {col_count} columns")
-                structure.append(f"    Style: {style_name}")
-                
-                # Show a preview of the first few cells
-                if row_count > 0 and len(table.rows[0].cells) > 0:
-                    structure.append(f"    Preview:")
-                    max_preview_rows = min(3, row_count)
-                    for r in range(max_preview_rows):
-                        row = table.rows[r]
-                        cell_texts = []
-                        for cell in row.cells[:min(3, len(row.cells))]:
-                            cell_text = cell.text[:20]
-                            if len(cell.text) > 20:
-                                cell_text += "..."
-                            cell_texts.append(f"\"{cell_text}\"")
-                        
-                        additional = "..." if len(row.cells) > 3 else ""
-                        structure.append(f"      Row {r}: {', '.join(cell_texts)}{additional}")
-        
-        return "\n".join(structure)
+        _STRUCTURE_CACHE.pop(doc_path, None)
+        _STRUCTURE_CACHE[doc_path] = (file_version, report)
+        if len(_STRUCTURE_CACHE) > _STRUCTURE_CACHE_SIZE:
+            del _STRUCTURE_CACHE[next(iter(_STRUCTURE_CACHE))]
+        return report
     except ValueError as e:
         return str(e)
     except Exception as e:
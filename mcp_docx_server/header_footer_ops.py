@@ -2,7 +2,25 @@
 Header and footer operations for Word documents.
 """
 
-from mcp_docx_server.utils import load_document, get_document_path, apply_paragraph_formatting
+from docx.enum.style import WD_STYLE_TYPE
+from docx.shared import Inches
+from mcp_docx_server.utils import load_document, get_document_path, apply_paragraph_formatting, split_table_data, fill_table_cells, save_document, style_checker, ensure_style_defined
+
+def _clear_extra_content(container) -> None:
+    """Removes all paragraphs but the first, and all tables, from a header or footer.
+    
+    The elements are selected with one XPath query rather than by wrapping every
+    paragraph in a Paragraph object.
+    """
+    element = container._element
+    for child in element.xpath("w:p[position() > 1] | w:tbl"):
+        element.remove(child)
+
+def _text_width(section):
+    """Returns the width between a section's margins, which header and footer tables span."""
+    if None in (section.page_width, section.left_margin, section.right_margin):
+        return Inches(6)
+    return section.page_width - section.left_margin - section.right_margin
 
 def add_header(doc_id: str, section_index: int, text: str = None, content: list = None) -> str:
     """Adds or modifies a header for a specific section.
@@ -31,9 +49,7 @@ def add_header(doc_id: str, section_index: int, text: str = None, content: list
             header.is_linked_to_previous = False
         
         # Clear existing content
-        for paragraph in header.paragraphs[1:]:
-            p = paragraph._element
-            p.getparent().remove(p)
+        _clear_extra_content(header)
         
         # If first paragraph exists, use it, otherwise add one
         if header.paragraphs:
@@ -48,6 +64,8 @@ def add_header(doc_id: str, section_index: int, text: str = None, content: list
         
         # If complex content is provided, add it
         if content:
+            # Style names are read once for all items; built-in styles are defined on first use
+            has_style = style_checker(document)
             for item in content:
                 content_type = item.get("type", "").lower()
                 item_text = item.get("text", "")
@@ -55,31 +73,10 @@ def add_header(doc_id: str, section_index: int, text: str = None, content: list
                 if content_type == "paragraph":
                     style = item.get("style", "Header")
                     
-                    # Check if style exists
-                    style_exists_in_doc = False
-                    for doc_style in document.styles:
-                        if doc_style.name == style:
-                            style_exists_in_doc = True
-                            break
-                    
-                    # If style doesn't exist, try to define it
-                    if not style_exists_in_doc and style == "Header":
-                        try:
-                            # Add temporary paragraph to define the style
-                            temp_para = document.add_paragraph("", style=style)
-                            # Remove the temporary paragraph
-                            p = temp_para._element
-                            p.getparent().remove(p)
-                        except KeyError:
-                            style = None  # Style not found
-                    
-                    # Add the paragraph
+                    # Add the paragraph, styled if the style is defined or built in
                     para = header.add_paragraph(item_text)
-                    if style:
-                        try:
-                            para.style = style
-                        except:
-                            pass  # Style not found, continue with default
+                    if style and has_style(style, WD_STYLE_TYPE.PARAGRAPH):
+                        para.style = style
                     
                     # Apply formatting if provided
                     formatting = item.get("formatting", {})
@@ -91,25 +88,17 @@ def add_header(doc_id: str, section_index: int, text: str = None, content: list
                     cols = item.get("cols", 1)
                     data = item.get("data", "")
                     
-                    table = header.add_table(rows=rows, cols=cols)
+                    table = header.add_table(rows=rows, cols=cols, width=_text_width(section))
                     
                     # Fill with data if provided
                     if data:
-                        data_list = data.split(',')
+                        data_list = split_table_data(data)
                         
-                        # Pad with empty strings if too few data elements
-                        if len(data_list) < rows * cols:
-                            data_list.extend([''] * (rows * cols - len(data_list)))
-                            
-                        # Fill table cells
-                        for i in range(rows):
-                            for j in range(cols):
-                                cell_idx = i * cols + j
-                                if cell_idx < len(data_list):
-                                    table.cell(i, j).text = data_list[cell_idx].strip()
+                        # Fill table cells (missing cells are left empty)
+                        fill_table_cells(table, data_list)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Header added/modified for section {section_index}."
     except ValueError as e:
         return str(e)
@@ -143,9 +132,7 @@ def add_footer(doc_id: str, section_index: int, text: str = None, content: list
             footer.is_linked_to_previous = False
         
         # Clear existing content
-        for paragraph in footer.paragraphs[1:]:
-            p = paragraph._element
-            p.getparent().remove(p)
+        _clear_extra_content(footer)
         
         # If first paragraph exists, use it, otherwise add one
         if footer.paragraphs:
@@ -160,6 +147,8 @@ def add_footer(doc_id: str, section_index: int, text: str = None, content: list
         
         # If complex content is provided, add it
         if content:
+            # Style names are read once for all items; built-in styles are defined on first use
+            has_style = style_checker(document)
             for item in content:
                 content_type = item.get("type", "").lower()
                 item_text = item.get("text", "")
@@ -167,31 +156,10 @@ def add_footer(doc_id: str, section_index: int, text: str = None, content: list
                 if content_type == "paragraph":
                     style = item.get("style", "Footer")
                     
-                    # Check if style exists
-                    style_exists_in_doc = False
-                    for doc_style in document.styles:
-                        if doc_style.name == style:
-                            style_exists_in_doc = True
-                            break
-                    
-                    # If style doesn't exist, try to define it
-                    if not style_exists_in_doc and style == "Footer":
-                        try:
-                            # Add temporary paragraph to define the style
-                            temp_para = document.add_paragraph("", style=style)
-                            # Remove the temporary paragraph
-                            p = temp_para._element
-                            p.getparent().remove(p)
-                        except KeyError:
-                            style = None  # Style not found
-                    
-                    # Add the paragraph
+                    # Add the paragraph, styled if the style is defined or built in
                     para = footer.add_paragraph(item_text)
-                    if style:
-                        try:
-                            para.style = style
-                        except:
-                            pass  # Style not found, continue with default
+                    if style and has_style(style, WD_STYLE_TYPE.PARAGRAPH):
+                        para.style = style
                     
                     # Apply formatting if provided
                     formatting = item.get("formatting", {})
@@ -203,25 +171,17 @@ def add_footer(doc_id: str, section_index: int, text: str = None, content: list
                     cols = item.get("cols", 1)
                     data = item.get("data", "")
                     
-                    table = footer.add_table(rows=rows, cols=cols)
+                    table = footer.add_table(rows=rows, cols=cols, width=_text_width(section))
                     
                     # Fill with data if provided
                     if data:
-                        data_list = data.split(',')
+                        data_list = split_table_data(data)
                         
-                        # Pad with empty strings if too few data elements
-                        if len(data_list) < rows * cols:
-                            data_list.extend([''] * (rows * cols - len(data_list)))
-                            
-                        # Fill table cells
-                        for i in range(rows):
-                            for j in range(cols):
-                                cell_idx = i * cols + j
-                                if cell_idx < len(data_list):
-                                    table.cell(i, j).text = data_list[cell_idx].strip()
+                        # Fill table cells (missing cells are left empty)
+                        fill_table_cells(table, data_list)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Footer added/modified for section {section_index}."
     except ValueError as e:
         return str(e)
@@ -267,44 +227,22 @@ def add_zoned_header(doc_id: str, section_index: int, left_text: str = "", cente
             header_text += f"\t\t{right_text}"
         
         # Clear existing content
-        for paragraph in header.paragraphs[1:]:
-            p = paragraph._element
-            p.getparent().remove(p)
-        
-        # Check if "Header" style exists and define it if needed
-        header_style_exists = False
-        for style in document.styles:
-            if style.name == "Header":
-                header_style_exists = True
-                break
-        
-        if not header_style_exists:
-            try:
-                # Add temporary paragraph to define the style
-                temp_para = document.add_paragraph("", style="Header")
-                # Remove the temporary paragraph
-                p = temp_para._element
-                p.getparent().remove(p)
-            except KeyError:
-                pass  # Style not found, continue with default style
+        _clear_extra_content(header)
         
         # Apply the text to the first paragraph
         if header.paragraphs:
             paragraph = header.paragraphs[0]
             paragraph.text = header_text
-            try:
-                paragraph.style = document.styles["Header"]
-            except:
-                pass  # Style not found, continue with default style
         else:
             paragraph = header.add_paragraph(header_text)
-            try:
-                paragraph.style = document.styles["Header"]
-            except:
-                pass
+        
+        # Use the "Header" style if it is defined or can be defined as a built-in style;
+        # otherwise the default style is kept
+        if ensure_style_defined(document, "Header", WD_STYLE_TYPE.PARAGRAPH):
+            paragraph.style = "Header"
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Zoned header added for section {section_index}."
     except ValueError as e:
         return str(e)
@@ -350,44 +288,22 @@ def add_zoned_footer(doc_id: str, section_index: int, left_text: str = "", cente
             footer_text += f"\t\t{right_text}"
         
         # Clear existing content
-        for paragraph in footer.paragraphs[1:]:
-            p = paragraph._element
-            p.getparent().remove(p)
-        
-        # Check if "Footer" style exists and define it if needed
-        footer_style_exists = False
-        for style in document.styles:
-            if style.name == "Footer":
-                footer_style_exists = True
-                break
-        
-        if not footer_style_exists:
-            try:
-                # Add temporary paragraph to define the style
-                temp_para = document.add_paragraph("", style="Footer")
-                # Remove the temporary paragraph
-                p = temp_para._element
-                p.getparent().remove(p)
-            except KeyError:
-                pass  # Style not found, continue with default style
+        _clear_extra_content(footer)
         
         # Apply the text to the first paragraph
         if footer.paragraphs:
             paragraph = footer.paragraphs[0]
             paragraph.text = footer_text
-            try:
-                paragraph.style = document.styles["Footer"]
-            except:
-                pass  # Style not found, continue with default style
         else:
             paragraph = footer.add_paragraph(footer_text)
-            try:
-                paragraph.style = document.styles["Footer"]
-            except:
-                pass
+        
+        # Use the "Footer" style if it is defined or can be defined as a built-in style;
+        # otherwise the default style is kept
+        if ensure_style_defined(document, "Footer", WD_STYLE_TYPE.PARAGRAPH):
+            paragraph.style = "Footer"
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Zoned footer added for section {section_index}."
     except ValueError as e:
         return str(e)
@@ -417,7 +333,7 @@ def remove_header(doc_id: str, section_index: int) -> str:
         header.is_linked_to_previous = True
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Header removed from section {section_index}."
     except ValueError as e:
         return str(e)
@@ -447,7 +363,7 @@ def remove_footer(doc_id: str, section_index: int) -> str:
         footer.is_linked_to_previous = True
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Footer removed from section {section_index}."
     except ValueError as e:
         return str(e)
@@ -465,7 +381,7 @@ def get_header_text(doc_id: str, section_index: int) -> str:
         str: The text content of the header or status message.
     """
     try:
-        document = load_document(doc_id)
+        document = load_document(doc_id, read_only=True)
         
         if not document.sections or section_index >= len(document.sections):
             return f"Error: Section index {section_index} is out of range. Document has {len(document.sections) if document.sections else 0} sections."
@@ -509,7 +425,7 @@ def get_footer_text(doc_id: str, section_index: int) -> str:
         str: The text content of the footer or status message.
     """
     try:
-        document = load_document(doc_id)
+        document = load_document(doc_id, read_only=True)
         
         if not document.sections or section_index >= len(document.sections):
             return f"Error: Section index {section_index} is out of range. Document has {len(document.sections) if document.sections else 0} sections."
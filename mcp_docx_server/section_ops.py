@@ -3,7 +3,39 @@ Section operations for Word documents.
 """
 
 from docx.enum.section import WD_SECTION, WD_ORIENT
-from mcp_docx_server.utils import load_document, get_document_path
+from mcp_docx_server.utils import load_document, get_document_path, save_document
+
+# Section break types accepted by add_section and set_section_properties
+_SECTION_START_TYPES = {
+    "NEW_PAGE": WD_SECTION.NEW_PAGE,
+    "EVEN_PAGE": WD_SECTION.EVEN_PAGE,
+    "ODD_PAGE": WD_SECTION.ODD_PAGE,
+    "CONTINUOUS": WD_SECTION.CONTINUOUS
+}
+
+# English Metric Units per inch, and its reciprocal for converting EMUs to inches
+_EMUS_PER_INCH = 914400
+_INCHES_PER_EMU = 1 / _EMUS_PER_INCH
+
+def _inches_to_emus(value) -> int:
+    """Converts a length in inches, given as a number or numeric string, to EMUs."""
+    # Whole inches, as JSON clients usually send them, convert exactly without floats
+    if type(value) is int:
+        return value * _EMUS_PER_INCH
+    return int(float(value) * _EMUS_PER_INCH)
+
+# Section properties set from a value in inches by set_section_properties
+_SECTION_DIMENSIONS = frozenset({
+    "page_width", "page_height",
+    "left_margin", "right_margin", "top_margin", "bottom_margin",
+    "gutter", "header_distance", "footer_distance"
+})
+
+# Page orientations accepted by set_section_properties
+_ORIENTATIONS = {
+    "PORTRAIT": WD_ORIENT.PORTRAIT,
+    "LANDSCAPE": WD_ORIENT.LANDSCAPE
+}
 
 def add_section(doc_id: str, start_type: str = "NEW_PAGE") -> str:
     """Adds a new section to the end of a document.
@@ -22,24 +54,16 @@ def add_section(doc_id: str, start_type: str = "NEW_PAGE") -> str:
     try:
         document = load_document(doc_id)
         
-        # Map string values to WD_SECTION enum
-        section_types = {
-            "NEW_PAGE": WD_SECTION.NEW_PAGE,
-            "EVEN_PAGE": WD_SECTION.EVEN_PAGE, 
-            "ODD_PAGE": WD_SECTION.ODD_PAGE,
-            "CONTINUOUS": WD_SECTION.CONTINUOUS
-        }
-        
-        # Get the section type value
-        section_type = section_types.get(start_type.upper())
-        if not section_type:
-            return f"Error: Invalid section start type '{start_type}'. Valid values are: {', '.join(section_types.keys())}"
+        # Get the section type value; CONTINUOUS is 0, so compare against None
+        section_type = _SECTION_START_TYPES.get(start_type.upper())
+        if section_type is None:
+            return f"Error: Invalid section start type '{start_type}'. Valid values are: {', '.join(_SECTION_START_TYPES.keys())}"
         
         # Add the new section
         document.add_section(section_type)
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Section with start type '{start_type}' added successfully."
     except ValueError as e:
         return str(e)
@@ -56,7 +80,7 @@ def list_sections(doc_id: str) -> str:
         str: Information about each section in the document.
     """
     try:
-        document = load_document(doc_id)
+        document = load_document(doc_id, read_only=True)
         
         if not document.sections:
             return f"No sections found in document '{doc_id}.docx'."
@@ -67,8 +91,8 @@ def list_sections(doc_id: str) -> str:
             orientation = "PORTRAIT" if section.orientation == WD_ORIENT.PORTRAIT else "LANDSCAPE"
             
             # Convert dimensions to inches for readability
-            page_width_inches = section.page_width / 914400  # 914400 = 1 inch in EMUs
-            page_height_inches = section.page_height / 914400
+            page_width_inches = section.page_width * _INCHES_PER_EMU
+            page_height_inches = section.page_height * _INCHES_PER_EMU
             
             # Create info string
             section_info = [
@@ -77,13 +101,13 @@ def list_sections(doc_id: str) -> str:
                 f"  Orientation: {orientation}",
                 f"  Page Size: {page_width_inches:.2f}\" x {page_height_inches:.2f}\"",
                 f"  Margins (inches):",
-                f"    Left: {section.left_margin/914400:.2f}\"",
-                f"    Right: {section.right_margin/914400:.2f}\"",
-                f"    Top: {section.top_margin/914400:.2f}\"",
-                f"    Bottom: {section.bottom_margin/914400:.2f}\"",
-                f"    Gutter: {section.gutter/914400:.2f}\"",
-                f"    Header Distance: {section.header_distance/914400:.2f}\"",
-                f"    Footer Distance: {section.footer_distance/914400:.2f}\""
+                f"    Left: {section.left_margin * _INCHES_PER_EMU:.2f}\"",
+                f"    Right: {section.right_margin * _INCHES_PER_EMU:.2f}\"",
+                f"    Top: {section.top_margin * _INCHES_PER_EMU:.2f}\"",
+                f"    Bottom: {section.bottom_margin * _INCHES_PER_EMU:.2f}\"",
+                f"    Gutter: {section.gutter * _INCHES_PER_EMU:.2f}\"",
+                f"    Header Distance: {section.header_distance * _INCHES_PER_EMU:.2f}\"",
+                f"    Footer Distance: {section.footer_distance * _INCHES_PER_EMU:.2f}\""
             ]
             sections_info.append("\n".join(section_info))
         
@@ -111,6 +135,10 @@ def set_section_properties(doc_id: str, section_index: int, properties: dict) ->
     Returns:
         str: A message indicating success or failure.
     """
+    # Skip the load/save round-trip when there is nothing to apply
+    if not properties:
+        return "No section properties specified; document left unchanged."
+    
     try:
         document = load_document(doc_id)
         
@@ -122,64 +150,32 @@ def set_section_properties(doc_id: str, section_index: int, properties: dict) ->
         # Handle start_type
         if "start_type" in properties:
             start_type = properties["start_type"].upper()
-            section_types = {
-                "NEW_PAGE": WD_SECTION.NEW_PAGE,
-                "EVEN_PAGE": WD_SECTION.EVEN_PAGE, 
-                "ODD_PAGE": WD_SECTION.ODD_PAGE,
-                "CONTINUOUS": WD_SECTION.CONTINUOUS
-            }
-            if start_type in section_types:
-                section.start_type = section_types[start_type]
+            if start_type in _SECTION_START_TYPES:
+                section.start_type = _SECTION_START_TYPES[start_type]
             else:
-                return f"Error: Invalid section start type '{start_type}'. Valid values are: {', '.join(section_types.keys())}"
+                return f"Error: Invalid section start type '{start_type}'. Valid values are: {', '.join(_SECTION_START_TYPES.keys())}"
         
         # Handle orientation
         if "orientation" in properties:
             orientation = properties["orientation"].upper()
-            if orientation == "LANDSCAPE":
-                # If changing to landscape, may need to swap width and height
-                if section.orientation == WD_ORIENT.PORTRAIT:
-                    # Store current dimensions before changing orientation
-                    old_width, old_height = section.page_width, section.page_height
-                    # Set orientation first
-                    section.orientation = WD_ORIENT.LANDSCAPE
-                    # If page dimensions are not explicitly set in properties, swap them
-                    if "page_width" not in properties and "page_height" not in properties:
-                        section.page_width, section.page_height = old_height, old_width
-                else:
-                    # Already landscape, just ensure orientation is set
-                    section.orientation = WD_ORIENT.LANDSCAPE
-            elif orientation == "PORTRAIT":
-                # If changing to portrait, may need to swap width and height
-                if section.orientation == WD_ORIENT.LANDSCAPE:
-                    # Store current dimensions before changing orientation
-                    old_width, old_height = section.page_width, section.page_height
-                    # Set orientation first
-                    section.orientation = WD_ORIENT.PORTRAIT
-                    # If page dimensions are not explicitly set in properties, swap them
-                    if "page_width" not in properties and "page_height" not in properties:
-                        section.page_width, section.page_height = old_height, old_width
-                else:
-                    # Already portrait, just ensure orientation is set
-                    section.orientation = WD_ORIENT.PORTRAIT
-            else:
+            new_orientation = _ORIENTATIONS.get(orientation)
+            if new_orientation is None:
                 return f"Error: Invalid orientation '{orientation}'. Valid values are: PORTRAIT, LANDSCAPE"
+            
+            # When the orientation actually changes, swap width and height unless page
+            # dimensions are set explicitly in properties
+            if section.orientation != new_orientation and "page_width" not in properties and "page_height" not in properties:
+                section.page_width, section.page_height = section.page_height, section.page_width
+            section.orientation = new_orientation
         
-        # Handle page dimensions (after orientation changes, if any)
-        if "page_width" in properties:
-            section.page_width = int(float(properties["page_width"]) * 914400)  # Convert inches to EMUs
-        
-        if "page_height" in properties:
-            section.page_height = int(float(properties["page_height"]) * 914400)  # Convert inches to EMUs
-        
-        # Handle margins
-        for margin_prop in ["left_margin", "right_margin", "top_margin", "bottom_margin", 
-                           "gutter", "header_distance", "footer_distance"]:
-            if margin_prop in properties:
-                setattr(section, margin_prop, int(float(properties[margin_prop]) * 914400))  # Convert inches to EMUs
+        # Handle page dimensions and margins (after orientation changes, if any) in a
+        # single pass over the supplied properties
+        for key, value in properties.items():
+            if key in _SECTION_DIMENSIONS:
+                setattr(section, key, _inches_to_emus(value))
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Properties for section {section_index} updated successfully."
     except ValueError as e:
         return str(e)
@@ -7,9 +7,10 @@ from mcp.server.fastmcp import FastMCP, Context
 # Import all operation modules using absolute imports
 from mcp_docx_server.document_ops import (
     create_document, create_complete_document, update_document,
-    append_to_document, replace_document, read_document,
-    check_document_exists, list_available_documents,
-    convert_to_pdf, analyze_document_structure
+    append_to_document, replace_document, read_document, read_documents, read_document_chunk,
+    read_paragraphs_range, check_document_exists, list_available_documents,
+    convert_to_pdf, convert_to_pdf_bytes, convert_many_to_pdf, flush_document_changes,
+    open_document, close_document, analyze_document_structure
 )
 
 from mcp_docx_server.style_ops import (
@@ -45,6 +46,9 @@ def get_document_content(doc_id: str) -> str:
 
 # Register all the document operations
 mcp.tool()(read_document)
+mcp.tool()(read_documents)
+mcp.tool()(read_document_chunk)
+mcp.tool()(read_paragraphs_range)
 mcp.tool()(check_document_exists)
 mcp.tool()(list_available_documents)
 mcp.tool()(create_document)
@@ -53,6 +57,11 @@ mcp.tool()(update_document)
 mcp.tool()(append_to_document)
 mcp.tool()(replace_document)
 mcp.tool()(convert_to_pdf)
+mcp.tool()(convert_to_pdf_bytes)
+mcp.tool()(convert_many_to_pdf)
+mcp.tool()(flush_document_changes)
+mcp.tool()(open_document)
+mcp.tool()(close_document)
 mcp.tool()(analyze_document_structure)
 
 # Register all the style operations
@@ -91,10 +100,8 @@ mcp.tool()(remove_footer)
 mcp.tool()(get_header_text)
 mcp.tool()(get_footer_text)
 
-@mcp.prompt()
-def word_document_usage() -> str:
-    """Provides guidance on how to use this MCP server with Word documents."""
-    return """
+# Usage guide returned by the word_document_usage prompt
+_WORD_DOCUMENT_USAGE = """
 # Word Document Server Usage Guide
 
 This server allows you to create, read, and manipulate Microsoft Word (.docx) documents. Here's how to use it effectively:
@@ -103,6 +110,9 @@ This server allows you to create, read, and manipulate Microsoft Word (.docx) do
 To read an existing document:
 - Use the resource: `word://document_name/content` (replace "document_name" with the filename without .docx extension)
 - Or call the tool: `read_document("document_name")`
+- To read several documents at once: `read_documents(["report", "notes"])`
+- For very large documents, read in chunks: `read_document_chunk("document_name", offset=0)` and pass the returned `next_offset` until `eof` is true
+- To read specific paragraphs only: `read_paragraphs_range("document_name", 10, 20)` (paragraphs 10 to 19)
 
 Example: To read a file named "bitcoin_overview.docx":
 - Request the resource: `word://bitcoin_overview/content`
@@ -137,6 +147,7 @@ Add content using any of these tools:
 - `add_heading("my_doc", "Section Heading", 1)` (levels 0-4, where 0 is title)
 - `add_table("my_doc", 3, 3, "Cell 1,Cell 2,Cell 3,Cell 4,Cell 5,Cell 6,Cell 7,Cell 8,Cell 9", "Table Grid")`
 - `add_image("my_doc", base64_image_data, "image.png", 4.0)`
+- `add_image("my_doc", "images/image.png", "image.png", 4.0)` - Image files in the documents directory can be passed by path (relative to that directory) or file:// URL instead of as base64 data
 
 ### Updating Documents
 
@@ -257,10 +268,16 @@ To convert a Word document to PDF format:
 
 `convert_to_pdf("my_document")` - This will create a PDF with the same name in the server directory
 
+To get the PDF back directly instead of as a file, use `convert_to_pdf_bytes("my_document")` - This returns `{"pdf_base64": ...}` with the PDF as base64-encoded data, or `{"error": ...}` if the conversion failed
+
+To convert several documents at once, use `convert_many_to_pdf(["doc_a", "doc_b"])` - the converter is started only once for the whole batch
+
 ## Utility Functions
 
-- Check if a document exists: `check_document_exists("my_document")`
+- Check if a document exists: `check_document_exists("my_document")` (pass `include_stats=True` to also count paragraphs)
 - List all available documents: `list_available_documents()`
+- Write pending changes to disk right away: `flush_document_changes()`
+- Make many edits to one document with a single save: `open_document("my_document")`, then edit, then `close_document("my_document")` (until then the edits are only held in memory and are lost if the server stops)
 - List available styles in a document: `list_styles("my_document")`
 
 ## Tips for Working with Word Documents
@@ -269,14 +286,14 @@ To convert a Word document to PDF format:
 
 - Check if a style exists before using it with `ensure_style_exists()`
 - Word ignores style applications if the style isn't defined in the document
-- Built-in styles need to be defined (used at least once) before they appear in the document
+- Common built-in Word styles (headings, Title, Quote, List Bullet, Table Grid and other table styles) that the document does not define yet are added to it with Word's formatting the first time they are used; other undefined styles are reported
 - Modifying a style affects all content using that style
 
 ### Document Structure:
 
 - Use `analyze_document_structure()` to understand document contents
 - Check paragraph indexes carefully (they start at 0)
-- Remember that changes are saved immediately
+- Changes are saved automatically a moment after each edit; tools in this server always see the latest changes
 
 ### Working with Sections:
 
@@ -287,5 +304,10 @@ To convert a Word document to PDF format:
 Remember to check the document path returned by `create_document()` to know where your files are stored.
 """
 
+@mcp.prompt()
+def word_document_usage() -> str:
+    """Provides guidance on how to use this MCP server with Word documents."""
+    return _WORD_DOCUMENT_USAGE
+
 if __name__ == "__main__":
     mcp.run()
@@ -3,13 +3,46 @@ Style management operations for Word documents.
 """
 
 from docx.enum.style import WD_STYLE_TYPE
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from mcp_docx_server.utils import load_document, get_document_path, style_exists
+from docx.shared import Pt
+from mcp_docx_server.utils import (
+    load_document, get_document_path, style_exists, read_styles, save_document, parse_color,
+    apply_paragraph_format, iter_document_structure, define_builtin_style, style_names,
+    STYLE_TYPES
+)
+
+# Style types accepted by the style tools; numbering styles cannot be created or applied
+_STYLE_TYPE_MAP = {name: STYLE_TYPES[name] for name in ("paragraph", "character", "table")}
+
+# Labels used in status messages and reports for each style type
+_STYLE_TYPE_LABELS = {
+    WD_STYLE_TYPE.PARAGRAPH: "Paragraph",
+    WD_STYLE_TYPE.CHARACTER: "Character",
+    WD_STYLE_TYPE.TABLE: "Table",
+    WD_STYLE_TYPE.LIST: "List"
+}
+
+def _ensure_style(document, style_name: str, style_type_enum) -> tuple:
+    """Defines a built-in style in a loaded document.
+    
+    Word's definition of the style is copied straight into the document's styles part
+    when python-docx's default template has it. The document is not saved, so callers can
+    combine this with other changes and save once. Returns (message, defined), where
+    defined is True if the document needs saving.
+    """
+    # Check if style already exists
+    if style_exists(document, style_name, style_type_enum):
+        return f"Style '{style_name}' already exists in document.", False
+    
+    if define_builtin_style(document, style_name, style_type_enum):
+        return f"{_STYLE_TYPE_LABELS[style_type_enum]} style '{style_name}' successfully defined in document.", True
+    
+    if style_name in style_names(document):
+        return f"Error: Style '{style_name}' exists in the document but is not a {_STYLE_TYPE_LABELS[style_type_enum].lower()} style.", False
+    return f"Error: Built-in style '{style_name}' not found in Word. Check the style name.", False
 
 def ensure_style_exists(doc_id: str, style_name: str, style_type: str = "paragraph") -> str:
     """
-    Ensures a style exists in the document by applying it to a temporary paragraph.
+    Ensures a built-in style is defined in the document.
     
     This is useful for built-in styles that need to be defined in the document before use.
     
@@ -25,69 +58,15 @@ def ensure_style_exists(doc_id: str, style_name: str, style_type: str = "paragra
         document = load_document(doc_id)
         
         # Map string type to enum
-        style_type_map = {
-            "paragraph": WD_STYLE_TYPE.PARAGRAPH,
-            "character": WD_STYLE_TYPE.CHARACTER,
-            "table": WD_STYLE_TYPE.TABLE
-        }
-        
-        if style_type.lower() not in style_type_map:
-            return f"Error: Invalid style type '{style_type}'. Valid values are: {', '.join(style_type_map.keys())}"
-        
-        style_type_enum = style_type_map[style_type.lower()]
-        
-        # Check if style already exists
-        if style_exists(document, style_name, style_type_enum):
-            return f"Style '{style_name}' already exists in document."
-        
-        # For paragraph style, add a temporary paragraph with the style
-        if style_type_enum == WD_STYLE_TYPE.PARAGRAPH:
-            try:
-                temp_para = document.add_paragraph("Style Definition", style=style_name)
-                # Remove the temporary paragraph
-                p = temp_para._element
-                p.getparent().remove(p)
-                
-                doc_path = get_document_path(doc_id)
-                document.save(doc_path)
-                return f"Paragraph style '{style_name}' successfully defined in document."
-            except KeyError:
-                return f"Error: Built-in style '{style_name}' not found in Word. Check the style name."
-        
-        # For character style, add a paragraph with a run using the style
-        elif style_type_enum == WD_STYLE_TYPE.CHARACTER:
-            try:
-                temp_para = document.add_paragraph()
-                temp_run = temp_para.add_run("Style Definition")
-                temp_run.style = style_name
-                
-                # Remove the temporary paragraph
-                p = temp_para._element
-                p.getparent().remove(p)
-                
-                doc_path = get_document_path(doc_id)
-                document.save(doc_path)
-                return f"Character style '{style_name}' successfully defined in document."
-            except KeyError:
-                return f"Error: Built-in style '{style_name}' not found in Word. Check the style name."
-        
-        # For table style, add a temporary table with the style
-        elif style_type_enum == WD_STYLE_TYPE.TABLE:
-            try:
-                temp_table = document.add_table(rows=1, cols=1)
-                temp_table.style = style_name
-                
-                # Remove the temporary table
-                p = temp_table._element
-                p.getparent().remove(p)
-                
-                doc_path = get_document_path(doc_id)
-                document.save(doc_path)
-                return f"Table style '{style_name}' successfully defined in document."
-            except KeyError:
-                return f"Error: Built-in style '{style_name}' not found in Word. Check the style name."
-        
-        return "Unknown error ensuring style exists."
+        style_type_enum = _STYLE_TYPE_MAP.get(style_type.lower())
+        if style_type_enum is None:
+            return f"Error: Invalid style type '{style_type}'. Valid values are: {', '.join(_STYLE_TYPE_MAP.keys())}"
+        
+        message, defined = _ensure_style(document, style_name, style_type_enum)
+        if defined:
+            doc_path = get_document_path(doc_id)
+            save_document(document, doc_path)
+        return message
     except ValueError as e:
         return str(e)
     except Exception as e:
@@ -110,16 +89,9 @@ def create_custom_style(doc_id: str, style_name: str, style_type: str = "paragra
         document = load_document(doc_id)
         
         # Map string type to enum
-        style_type_map = {
-            "paragraph": WD_STYLE_TYPE.PARAGRAPH,
-            "character": WD_STYLE_TYPE.CHARACTER,
-            "table": WD_STYLE_TYPE.TABLE
-        }
-        
-        if style_type.lower() not in style_type_map:
-            return f"Error: Invalid style type '{style_type}'. Valid values are: {', '.join(style_type_map.keys())}"
-        
-        style_type_enum = style_type_map[style_type.lower()]
+        style_type_enum = _STYLE_TYPE_MAP.get(style_type.lower())
+        if style_type_enum is None:
+            return f"Error: Invalid style type '{style_type}'. Valid values are: {', '.join(_STYLE_TYPE_MAP.keys())}"
         
         # Check if style already exists
         if style_exists(document, style_name, style_type_enum):
@@ -128,8 +100,9 @@ def create_custom_style(doc_id: str, style_name: str, style_type: str = "paragra
         # If base_style is provided, ensure it exists first
         if base_style:
             if not style_exists(document, base_style, style_type_enum):
-                # Try to ensure base style exists if it's a built-in style
-                ensure_result = ensure_style_exists(doc_id, base_style, style_type)
+                # Try to ensure base style exists if it's a built-in style; this works on
+                # the same document, which is saved once below
+                ensure_result, _ = _ensure_style(document, base_style, style_type_enum)
                 if "Error" in ensure_result or "not found" in ensure_result:
                     return f"Error: Base style '{base_style}' does not exist and could not be defined."
         
@@ -144,7 +117,7 @@ def create_custom_style(doc_id: str, style_name: str, style_type: str = "paragra
                 return f"Error setting base style: Style '{base_style}' not found."
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Custom {style_type} style '{style_name}' created successfully."
     except ValueError as e:
         return str(e)
@@ -165,6 +138,9 @@ def modify_style(doc_id: str, style_name: str, properties: dict) -> str:
     Returns:
         str: Status message indicating success or failure.
     """
+    if not properties:
+        return "No style properties specified; document left unchanged."
+    
     try:
         document = load_document(doc_id)
         
@@ -199,88 +175,14 @@ def modify_style(doc_id: str, style_name: str, properties: dict) -> str:
             
             # Font color
             if "color" in font_props:
-                color = font_props["color"]
-                if color.startswith('#'):
-                    # Convert hex color to RGB
-                    r = int(color[1:3], 16)
-                    g = int(color[3:5], 16)
-                    b = int(color[5:7], 16)
-                    font.color.rgb = RGBColor(r, g, b)
-                elif color.startswith('rgb('):
-                    # Parse rgb() format
-                    rgb = color.strip('rgb()').split(',')
-                    if len(rgb) == 3:
-                        r = int(rgb[0].strip())
-                        g = int(rgb[1].strip())
-                        b = int(rgb[2].strip())
-                        font.color.rgb = RGBColor(r, g, b)
+                rgb_color = parse_color(font_props["color"])
+                if rgb_color is not None:
+                    font.color.rgb = rgb_color
         
         # Modify paragraph formatting properties if provided
         para_props = properties.get("paragraph", {})
         if para_props and hasattr(style, "paragraph_format"):
-            para_format = style.paragraph_format
-            
-            # Alignment
-            alignment = para_props.get("alignment")
-            if alignment:
-                alignment_map = {
-                    "LEFT": WD_ALIGN_PARAGRAPH.LEFT,
-                    "CENTER": WD_ALIGN_PARAGRAPH.CENTER,
-                    "RIGHT": WD_ALIGN_PARAGRAPH.RIGHT,
-                    "JUSTIFY": WD_ALIGN_PARAGRAPH.JUSTIFY
-                }
-                if alignment.upper() in alignment_map:
-                    para_format.alignment = alignment_map[alignment.upper()]
-            
-            # Indentation
-            left_indent = para_props.get("left_indent")
-            if left_indent is not None:
-                para_format.left_indent = Inches(float(left_indent))
-            
-            right_indent = para_props.get("right_indent")
-            if right_indent is not None:
-                para_format.right_indent = Inches(float(right_indent))
-            
-            first_line_indent = para_props.get("first_line_indent")
-            if first_line_indent is not None:
-                para_format.first_line_indent = Inches(float(first_line_indent))
-            
-            # Spacing
-            space_before = para_props.get("space_before")
-            if space_before is not None:
-                para_format.space_before = Pt(float(space_before))
-            
-            space_after = para_props.get("space_after")
-            if space_after is not None:
-                para_format.space_after = Pt(float(space_after))
-            
-            # Line spacing
-            line_spacing = para_props.get("line_spacing")
-            if line_spacing is not None:
-                try:
-                    # Try as a float (multiple)
-                    spacing_float = float(line_spacing)
-                    para_format.line_spacing = spacing_float
-                except ValueError:
-                    # Try as a point value
-                    para_format.line_spacing = Pt(float(line_spacing))
-            
-            # Pagination
-            keep_together = para_props.get("keep_together")
-            if keep_together is not None:
-                para_format.keep_together = bool(keep_together)
-            
-            keep_with_next = para_props.get("keep_with_next")
-            if keep_with_next is not None:
-                para_format.keep_with_next = bool(keep_with_next)
-            
-            page_break_before = para_props.get("page_break_before")
-            if page_break_before is not None:
-                para_format.page_break_before = bool(page_break_before)
-            
-            widow_control = para_props.get("widow_control")
-            if widow_control is not None:
-                para_format.widow_control = bool(widow_control)
+            apply_paragraph_format(style.paragraph_format, para_props)
         
         # Additional style properties
         if "quick_style" in properties:
@@ -293,7 +195,7 @@ def modify_style(doc_id: str, style_name: str, properties: dict) -> str:
             style.priority = int(properties["priority"])
         
         doc_path = get_document_path(doc_id)
-        document.save(doc_path)
+        save_document(document, doc_path)
         return f"Style '{style_name}' modified successfully."
     except ValueError as e:
         return str(e)
@@ -313,72 +215,48 @@ def get_styles_detail(doc_id: str, style_type: str = None) -> str:
         str: Detailed information about styles in the document.
     """
     try:
-        document = load_document(doc_id)
+        document = load_document(doc_id, read_only=True)
         
         # Map string type to enum if provided
         style_type_enum = None
         if style_type:
-            style_type_map = {
-                "paragraph": WD_STYLE_TYPE.PARAGRAPH,
-                "character": WD_STYLE_TYPE.CHARACTER,
-                "table": WD_STYLE_TYPE.TABLE
-            }
-            
-            if style_type.lower() not in style_type_map:
-                return f"Error: Invalid style type '{style_type}'. Valid values are: {', '.join(style_type_map.keys())}"
-            
-            style_type_enum = style_type_map[style_type.lower()]
+            style_type_enum = _STYLE_TYPE_MAP.get(style_type.lower())
+            if style_type_enum is None:
+                return f"Error: Invalid style type '{style_type}'. Valid values are: {', '.join(_STYLE_TYPE_MAP.keys())}"
         
-        # Get styles
-        styles_info = []
+        # Get styles, collecting every output line in one list that is joined once
+        lines = []
         for style in document.styles:
             # Skip if filtering by type and this style doesn't match
             if style_type_enum and style.type != style_type_enum:
                 continue
             
             # Get style type as string
-            style_type_str = "Unknown"
-            if style.type == WD_STYLE_TYPE.PARAGRAPH:
-                style_type_str = "Paragraph"
-            elif style.type == WD_STYLE_TYPE.CHARACTER:
-                style_type_str = "Character"
-            elif style.type == WD_STYLE_TYPE.TABLE:
-                style_type_str = "Table"
-            elif style.type == WD_STYLE_TYPE.LIST:
-                style_type_str = "List"
+            style_type_str = _STYLE_TYPE_LABELS.get(style.type, "Unknown")
+            
+            # Get base style name if available; numbering styles have no base style
+            base_style = getattr(style, "base_style", None)
+            base_style = base_style.name if base_style else "None"
             
-            # Get base style name if available
-            base_style = "None"
-            if hasattr(style, "base_style") and style.base_style:
-                base_style = style.base_style.name
+            # Separate styles with a blank line
+            if lines:
+                lines.append("")
             
-            # Create style info
-            style_info = [
+            # Style info and behavior properties, which every style type has
+            lines += [
                 f"Style: {style.name}",
                 f"  Type: {style_type_str}",
-                f"  Base Style: {base_style}"
+                f"  Base Style: {base_style}",
+                "  Behavior:",
+                f"    Quick Style: {style.quick_style}",
+                f"    Priority: {style.priority}",
+                f"    Hidden: {style.hidden}"
             ]
-            
-            # Add behavior properties if available
-            behavior_props = []
-            if hasattr(style, "quick_style"):
-                behavior_props.append(f"Quick Style: {style.quick_style}")
-            if hasattr(style, "priority"):
-                behavior_props.append(f"Priority: {style.priority}")
-            if hasattr(style, "hidden"):
-                behavior_props.append(f"Hidden: {style.hidden}")
-            
-            if behavior_props:
-                style_info.append("  Behavior:")
-                for prop in behavior_props:
-                    style_info.append(f"    {prop}")
-            
-            styles_info.append("\n".join(style_info))
         
-        if not styles_info:
+        if not lines:
             return f"No styles found in document{' with type ' + style_type if style_type else ''}."
         
-        return "\n\n".join(styles_info)
+        return "\n".join(lines)
     except ValueError as e:
         return str(e)
     except Exception as e:
@@ -396,48 +274,51 @@ def check_style_usage(doc_id: str, style_name: str) -> str:
         str: Information about where the style is used.
     """
     try:
-        document = load_document(doc_id)
+        from docx.styles import BabelFish
         
-        # Check if style exists
-        try:
-            style = document.styles[style_name]
-        except KeyError:
+        # Check if style exists; like document.styles[], match on the internal name
+        internal_name = BabelFish.ui2internal(style_name)
+        style_type = next((style_type for name, style_type in read_styles(doc_id)
+                           if name is not None and BabelFish.ui2internal(name) == internal_name), None)
+        if style_type is None:
             return f"Style '{style_name}' not found in document."
         
         # Get style type
-        style_type_str = "Unknown"
-        if style.type == WD_STYLE_TYPE.PARAGRAPH:
-            style_type_str = "Paragraph"
-        elif style.type == WD_STYLE_TYPE.CHARACTER:
-            style_type_str = "Character"
-        elif style.type == WD_STYLE_TYPE.TABLE:
-            style_type_str = "Table"
+        style_type_str = _STYLE_TYPE_LABELS.get(style_type, "Unknown")
         
-        # Check usage based on style type
+        # Check usage based on style type, streaming the document body
         usage_locations = []
-        
-        # Check paragraphs for paragraph and character styles
-        if style.type in (WD_STYLE_TYPE.PARAGRAPH, WD_STYLE_TYPE.CHARACTER):
-            for i, para in enumerate(document.paragraphs):
-                # Check paragraph style
-                if style.type == WD_STYLE_TYPE.PARAGRAPH and para.style and para.style.name == style_name:
-                    preview = para.text[:30] + ("..." if len(para.text) > 30 else "")
-                    usage_locations.append(f"Paragraph {i}: \"{preview}\"")
+        if style_type in (WD_STYLE_TYPE.PARAGRAPH, WD_STYLE_TYPE.CHARACTER, WD_STYLE_TYPE.TABLE):
+            paragraph_index = 0
+            table_index = 0
+            for item in iter_document_structure(doc_id):
+                if item[0] == "paragraph":
+                    _, text, para_style, runs = item
+                    i = paragraph_index
+                    paragraph_index += 1
+                    
+                    # Check paragraph style
+                    if style_type == WD_STYLE_TYPE.PARAGRAPH and para_style == style_name:
+                        preview = text[:30] + ("..." if len(text) > 30 else "")
+                        usage_locations.append(f"Paragraph {i}: \"{preview}\"")
+                    
+                    # Check character styles in runs
+                    if style_type == WD_STYLE_TYPE.CHARACTER:
+                        for j, (run_style, _, _, run_text) in enumerate(runs):
+                            if run_style == style_name:
+                                preview = run_text[:30] + ("..." if len(run_text) > 30 else "")
+                                usage_locations.append(f"Paragraph {i}, Run {j}: \"{preview}\"")
                 
-                # Check character styles in runs
-                if style.type == WD_STYLE_TYPE.CHARACTER:
-                    for j, run in enumerate(para.runs):
-                        if run.style and run.style.name == style_name:
-                            preview = run.text[:30] + ("..." if len(run.text) > 30 else "")
-                            usage_locations.append(f"Paragraph {i}, Run {j}: \"{preview}\"")
-        
-        # Check tables for table styles
-        if style.type == WD_STYLE_TYPE.TABLE:
-            for i, table in enumerate(document.tables):
-                if table.style and table.style.name == style_name:
-                    rows = len(table.rows)
-                    cols = len(table.rows[0].cells) if rows > 0 else 0
-                    usage_locations.append(f"Table {i}: {rows}x{cols} table")
+                # Check tables for table styles
+                elif style_type == WD_STYLE_TYPE.TABLE:
+                    _, table_style, table_rows = item
+                    i = table_index
+                    table_index += 1
+                    
+                    if table_style == style_name:
+                        rows = len(table_rows)
+                        cols = len(table_rows[0][1]) if rows > 0 else 0
+                        usage_locations.append(f"Table {i}: {rows}x{cols} table")
         
         # Report results
         if not usage_locations:
@@ -452,18 +333,20 @@ def check_style_usage(doc_id: str, style_name: str) -> str:
 def list_styles(doc_id: str) -> str:
     """Lists available paragraph and character styles in the document."""
     try:
-        document = load_document(doc_id)
         para_styles = []
         char_styles = []
         table_styles = []
+        styles_by_type = {
+            WD_STYLE_TYPE.PARAGRAPH: para_styles,
+            WD_STYLE_TYPE.CHARACTER: char_styles,
+            WD_STYLE_TYPE.TABLE: table_styles
+        }
         
-        for style in document.styles:
-            if style.type == WD_STYLE_TYPE.PARAGRAPH:
-                para_styles.append(style.name)
-            elif style.type == WD_STYLE_TYPE.CHARACTER:
-                char_styles.append(style.name)
-            elif style.type == WD_STYLE_TYPE.TABLE:
-                table_styles.append(style.name)
+        # Partition in a single pass with one dict lookup per style
+        for name, style_type in read_styles(doc_id):
+            names = styles_by_type.get(style_type)
+            if names is not None:
+                names.append(name)
         
         result = []
         if para_styles:
@@ -3,268 +3,1005 @@ Utility functions for working with Word documents.
 """
 
 from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Inches, Pt
+from collections import OrderedDict
+from copy import deepcopy
+from functools import lru_cache
+from itertools import islice
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
+import atexit
+import csv
 import os
+import re
+import sys
+import threading
+import zipfile
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 
+def _configure_xml_parser():
+    """Replaces python-docx's shared XML parser with one suited to large documents.
+    
+    huge_tree lifts libxml2's limits on text node size and nesting depth, which large
+    documents can exceed, and collect_ids skips building the xml:id lookup table that
+    python-docx never uses. The remaining options match python-docx's own parser.
+    """
+    import docx.oxml.parser
+    from lxml import etree
+
+    parser = etree.XMLParser(remove_blank_text=True, resolve_entities=False,
+                             huge_tree=True, collect_ids=False)
+    parser.set_element_class_lookup(docx.oxml.parser.element_class_lookup)
+    docx.oxml.parser.oxml_parser = parser
+
+_configure_xml_parser()
+
+# Resolved once at import time; documents live in the project root
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCUMENTS_DIR = os.path.dirname(_SCRIPT_DIR)  # Go up one level to the project root
+_DOCUMENT_PATH_PREFIX = os.path.join(DOCUMENTS_DIR, "")
+
+class DocumentNotFoundError(ValueError):
+    """Raised when a document does not exist; str() gives the message shown to the client."""
+    
+    def __init__(self, doc_id: str):
+        super().__init__(f"Document '{doc_id}.docx' not found.")
+        self.doc_id = doc_id
+
+# Characters that cannot appear in a document ID: path separators, which would
+# reach outside the documents directory, drive separators and control characters
+_INVALID_DOC_ID_CHARS = re.compile(r"[\\/:\x00-\x1f]")
+
+@lru_cache(maxsize=128)
 def get_document_path(doc_id: str) -> str:
-    """Returns the full path to a document in the same directory as this script."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(script_dir)  # Go up one level to the project root
-    return os.path.join(parent_dir, f"{doc_id}.docx")
+    """Returns the full path to a document in the project root directory.
+    
+    Raises ValueError for an ID that is empty or is not a plain file name, before
+    any file system access.
+    """
+    if not doc_id or _INVALID_DOC_ID_CHARS.search(doc_id):
+        raise ValueError(f"Invalid document ID '{doc_id}'. Use a file name without a directory or extension.")
+    return _DOCUMENT_PATH_PREFIX + doc_id + ".docx"
+
+def resolve_image_path(image_data: str):
+    """Returns the image file that add_image's image_data refers to, or None for base64 data.
+    
+    image_data may be a file:// URL or a file path, relative paths being resolved
+    against the documents directory. Raises ValueError for files outside the
+    documents directory, which the server does not expose to clients.
+    """
+    if image_data.startswith("file://"):
+        image_path = url2pathname(urlparse(image_data).path)
+    elif len(image_data) < 4096 and os.path.isfile(os.path.join(DOCUMENTS_DIR, image_data)):
+        image_path = os.path.join(DOCUMENTS_DIR, image_data)
+    else:
+        return None
+    
+    image_path = os.path.realpath(image_path)
+    documents_dir = os.path.realpath(DOCUMENTS_DIR)
+    if os.path.commonpath([image_path, documents_dir]) != documents_dir:
+        raise ValueError(f"Error: Image file '{image_data}' is outside the documents directory.")
+    return image_path
 
-def load_document(doc_id: str) -> Document:
-    """Loads a Word document, handling potential FileNotFoundError."""
+# Parsed documents keyed by path, together with the file version they were read
+# from or saved as. Bounded to the most recently used documents.
+_DOCUMENT_CACHE = OrderedDict()
+_DOCUMENT_CACHE_SIZE = 8
+
+def _file_version(doc_path: str) -> tuple:
+    """Returns a value that changes whenever the file at doc_path is rewritten."""
+    stat = os.stat(doc_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _cache_document(doc_path: str, file_version: tuple, document) -> None:
+    """Stores a parsed document in the cache, evicting the least recently used one."""
+    _DOCUMENT_CACHE[doc_path] = (file_version, document)
+    _DOCUMENT_CACHE.move_to_end(doc_path)
+    while len(_DOCUMENT_CACHE) > _DOCUMENT_CACHE_SIZE:
+        _DOCUMENT_CACHE.popitem(last=False)
+
+# Saves are debounced: save_document() serializes the document into a pending save
+# and a timer writes it once no further save of the same path arrives within
+# _SAVE_DELAY seconds, so a burst of edits costs a single write. Each entry holds the
+# saved document, the package bytes it was serialized to and the timer. Only the
+# bytes are ever written; the document is handed to the next tool that edits the
+# file and is None while a tool has it checked out.
+_PENDING_SAVES = {}
+_SAVE_DELAY = 0.15
+_SAVE_LOCK = threading.Lock()
+
+# Paths of documents opened with open_document_session(); their saves stay pending
+# without a timer until the session is closed or a read needs the file on disk
+_OPEN_SESSIONS = set()
+
+# Errors from pending saves that could not be written, keyed by path, until the next
+# tool that edits the document or flush_document_changes() reports them
+_SAVE_ERRORS = {}
+
+def load_document(doc_id: str, read_only: bool = False) -> Document:
+    """Loads a Word document, handling potential FileNotFoundError.
+    
+    Documents are reused from the cache while the file on disk is unchanged. A
+    document loaded for modification is taken out of the cache and only goes back
+    in when save_document() is called, so an operation that fails half-way never
+    leaves a partly modified document behind. Callers that pass read_only=True
+    must not modify the document; it stays in the cache for later calls.
+    
+    A document with a pending save is loaded from that save rather than the file.
+    The same rule applies: if the tool that took the saved document out fails
+    without saving, the next load parses the saved bytes again. A load for
+    modification raises ValueError once if the document's last pending save could
+    not be written.
+    """
     doc_path = get_document_path(doc_id)
+    with _SAVE_LOCK:
+        if not read_only and doc_path in _SAVE_ERRORS:
+            raise ValueError(f"Error saving document '{doc_id}.docx': {_SAVE_ERRORS.pop(doc_path)}. "
+                             f"Changes made since it was last written were lost.")
+        try:
+            pending = _PENDING_SAVES.get(doc_path)
+            if pending is not None:
+                document = pending[0]
+                if document is None:
+                    document = Document(BytesIO(pending[1]))
+                pending[0] = document if read_only else None
+                return document
+            
+            file_version = _file_version(doc_path)
+            cached = _DOCUMENT_CACHE.pop(doc_path, None)
+            if cached is not None and cached[0] == file_version:
+                document = cached[1]
+            else:
+                document = Document(doc_path)
+        except FileNotFoundError:
+            raise DocumentNotFoundError(doc_id)
+        except Exception as e:
+            raise ValueError(f"Error loading document '{doc_id}.docx': {str(e)}")
+        
+        if read_only:
+            _cache_document(doc_path, file_version, document)
+        return document
+
+def save_document(document, doc_path: str, defer: bool = True) -> None:
+    """Schedules a document to be written to disk.
+    
+    The document is serialized straight away and the pending save keeps those bytes,
+    so later changes to the document object never reach the file unless it is saved
+    again. The write happens _SAVE_DELAY seconds after the last save of the same
+    path, or when the session is closed for a document opened with
+    open_document_session(). Code that reads the file itself must call
+    flush_pending_saves() first.
+    
+    Args:
+        document: The python-docx Document.
+        doc_path (str): The path to write the document to.
+        defer (bool): Whether to debounce the write. If False the document is written
+            before returning and write errors are raised, unless a session is open.
+    """
+    with BytesIO() as stream:
+        document.save(stream)
+        data = stream.getvalue()
+    
+    with _SAVE_LOCK:
+        pending = _PENDING_SAVES.get(doc_path)
+        if pending is not None and pending[2] is not None:
+            pending[2].cancel()
+        _DOCUMENT_CACHE.pop(doc_path, None)
+        
+        if doc_path in _OPEN_SESSIONS:
+            _PENDING_SAVES[doc_path] = [document, data, None]
+            return
+        
+        if not defer:
+            _PENDING_SAVES.pop(doc_path, None)
+            _SAVE_ERRORS.pop(doc_path, None)
+            _write_package(data, doc_path)
+            _cache_document(doc_path, _file_version(doc_path), document)
+            return
+        
+        timer = threading.Timer(_SAVE_DELAY, _save_when_idle)
+        timer.args = (doc_path, timer)
+        _PENDING_SAVES[doc_path] = [document, data, timer]
+        timer.start()
+
+def _save_when_idle(doc_path: str, timer) -> None:
+    """Timer callback that writes a pending save unless it was superseded."""
+    with _SAVE_LOCK:
+        pending = _PENDING_SAVES.get(doc_path)
+        if pending is not None and pending[2] is timer:
+            _flush_pending_save(doc_path)
+
+def _flush_pending_save(doc_path: str) -> bool:
+    """Writes the pending save for doc_path, if any. Must be called with _SAVE_LOCK held.
+    
+    A save that cannot be written is dropped rather than retried, and its error is
+    kept in _SAVE_ERRORS. Returns True if the document was written.
+    """
+    pending = _PENDING_SAVES.pop(doc_path, None)
+    if pending is None:
+        return False
+    
+    document, data, timer = pending
+    if timer is not None:
+        timer.cancel()
     try:
-        return Document(doc_path)
+        _write_package(data, doc_path)
+    except Exception as e:
+        _SAVE_ERRORS[doc_path] = str(e)
+        return False
+    
+    # A document that a tool has checked out may hold unsaved changes, so it is not cached
+    if document is not None:
+        _cache_document(doc_path, _file_version(doc_path), document)
+    return True
+
+def flush_pending_saves(doc_path: str = None) -> int:
+    """Writes pending saves to disk immediately.
+    
+    Every pending save is attempted; those that fail are left for pop_save_errors().
+    
+    Args:
+        doc_path (str): Only flush this document. All pending saves are flushed if omitted.
+    
+    Returns:
+        int: The number of documents written.
+    """
+    with _SAVE_LOCK:
+        doc_paths = [doc_path] if doc_path is not None else list(_PENDING_SAVES)
+        return sum(_flush_pending_save(path) for path in doc_paths)
+
+def pop_save_errors(doc_path: str = None) -> dict:
+    """Returns and forgets the errors of pending saves that could not be written.
+    
+    Args:
+        doc_path (str): Only return the error for this document. All errors are returned if omitted.
+    
+    Returns:
+        dict: The error messages keyed by document path.
+    """
+    with _SAVE_LOCK:
+        if doc_path is None:
+            errors = dict(_SAVE_ERRORS)
+            _SAVE_ERRORS.clear()
+            return errors
+        if doc_path in _SAVE_ERRORS:
+            return {doc_path: _SAVE_ERRORS.pop(doc_path)}
+        return {}
+
+def _flush_at_exit() -> None:
+    """Writes every pending save when the server exits, reporting failures on stderr."""
+    flush_pending_saves()
+    for doc_path, error in pop_save_errors().items():
+        print(f"Error saving document '{doc_path}': {error}", file=sys.stderr)
+
+atexit.register(_flush_at_exit)
+
+def open_document_session(doc_id: str) -> bool:
+    """Keeps later saves of a document in memory until close_document_session().
+    
+    Returns False if a session was already open for the document.
+    """
+    doc_path = get_document_path(doc_id)
+    with _SAVE_LOCK:
+        if doc_path not in _PENDING_SAVES and not os.path.exists(doc_path):
+            raise DocumentNotFoundError(doc_id)
+        if doc_path in _OPEN_SESSIONS:
+            return False
+        _OPEN_SESSIONS.add(doc_path)
+        return True
+
+def close_document_session(doc_id: str) -> bool:
+    """Ends a document's session and writes its pending changes, if any.
+    
+    Returns False if no session was open for the document. Raises ValueError if the
+    changes could not be written.
+    """
+    doc_path = get_document_path(doc_id)
+    with _SAVE_LOCK:
+        if doc_path not in _OPEN_SESSIONS:
+            return False
+        _OPEN_SESSIONS.discard(doc_path)
+        _flush_pending_save(doc_path)
+        if doc_path in _SAVE_ERRORS:
+            raise ValueError(f"Error saving document '{doc_id}.docx': {_SAVE_ERRORS.pop(doc_path)}")
+        return True
+
+def _write_package(data: bytes, doc_path: str) -> None:
+    """Writes a serialized document atomically.
+    
+    The package is written to a temporary file that then replaces the original, so
+    readers never see a partial file. The temporary file is flushed to disk before the
+    rename so a crash cannot leave an empty or truncated document behind, and its name
+    carries the process id so servers sharing a documents directory never write to
+    the same file.
+    """
+    tmp_path = f"{doc_path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, doc_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# Paragraph alignment values accepted in formatting dicts
+ALIGNMENT_MAP = {
+    "LEFT": WD_ALIGN_PARAGRAPH.LEFT,
+    "CENTER": WD_ALIGN_PARAGRAPH.CENTER,
+    "RIGHT": WD_ALIGN_PARAGRAPH.RIGHT,
+    "JUSTIFY": WD_ALIGN_PARAGRAPH.JUSTIFY
+}
+
+# Matches the six hex digits at the start of a '#RRGGBB' color string
+_HEX_COLOR = re.compile(r"#([0-9a-fA-F]{6})")
+
+# Matches an 'rgb(r, g, b)' color string, capturing the three channels
+_RGB_COLOR = re.compile(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+
+# Style types keyed by their w:type attribute value
+STYLE_TYPES = {
+    "paragraph": WD_STYLE_TYPE.PARAGRAPH,
+    "character": WD_STYLE_TYPE.CHARACTER,
+    "table": WD_STYLE_TYPE.TABLE,
+    "numbering": WD_STYLE_TYPE.LIST
+}
+
+# Style names used by document.add_heading() for each heading level
+HEADING_STYLES = {0: "Title", **{level: f"Heading {level}" for level in range(1, 10)}}
+
+# Read-only fast paths
+#
+# Operations that only read text or style names parse the relevant XML part
+# straight out of the package instead of building the full python-docx object graph.
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY = _W_NS + "body"
+_W_P = _W_NS + "p"
+_W_R = _W_NS + "r"
+_W_T = _W_NS + "t"
+_W_BR = _W_NS + "br"
+_W_HYPERLINK = _W_NS + "hyperlink"
+_W_STYLE = _W_NS + "style"
+_W_NAME = _W_NS + "name"
+_W_TYPE = _W_NS + "type"
+_W_VAL = _W_NS + "val"
+_W_TBL = _W_NS + "tbl"
+_W_TR = _W_NS + "tr"
+_W_TC = _W_NS + "tc"
+_W_TRPR = _W_NS + "trPr"
+_W_TCPR = _W_NS + "tcPr"
+_W_GRID_BEFORE = _W_NS + "gridBefore"
+_W_GRID_AFTER = _W_NS + "gridAfter"
+_W_GRID_SPAN = _W_NS + "gridSpan"
+_W_VMERGE = _W_NS + "vMerge"
+_W_PPR = _W_NS + "pPr"
+_W_PSTYLE = _W_NS + "pStyle"
+_W_RPR = _W_NS + "rPr"
+_W_RSTYLE = _W_NS + "rStyle"
+_W_TBLPR = _W_NS + "tblPr"
+_W_TBLSTYLE = _W_NS + "tblStyle"
+_W_B = _W_NS + "b"
+_W_I = _W_NS + "i"
+_W_STYLE_ID = _W_NS + "styleId"
+_W_DEFAULT = _W_NS + "default"
+
+# Text equivalents of run content elements other than w:t and w:br
+_RUN_CONTENT_TEXT = {
+    _W_NS + "tab": "\t",
+    _W_NS + "ptab": "\t",
+    _W_NS + "cr": "\n",
+    _W_NS + "noBreakHyphen": "-",
+}
+
+def load_document_part(doc_id: str, part_name: str = "word/document.xml") -> ElementTree.Element:
+    """Parses a single XML part of a document without loading it through python-docx.
+    
+    Raises KeyError if the package does not contain the part.
+    """
+    doc_path = get_document_path(doc_id)
+    try:
+        flush_pending_saves(doc_path)
+        with zipfile.ZipFile(doc_path) as package:
+            return ElementTree.fromstring(package.read(part_name))
+    except KeyError:
+        raise
     except FileNotFoundError:
-        raise ValueError(f"Document '{doc_id}.docx' not found.")
+        raise DocumentNotFoundError(doc_id)
     except Exception as e:
         raise ValueError(f"Error loading document '{doc_id}.docx': {str(e)}")
 
+def _run_text(run) -> str:
+    """Returns the text of a w:r element, matching python-docx's Run.text."""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _W_T:
+            parts.append(child.text or "")
+        elif tag == _W_BR:
+            # Only line breaks have a text equivalent; page and column breaks do not
+            if child.get(_W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_CONTENT_TEXT:
+            parts.append(_RUN_CONTENT_TEXT[tag])
+    return "".join(parts)
+
+def paragraph_text(paragraph) -> str:
+    """Returns the text of a w:p element, matching python-docx's Paragraph.text."""
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_R:
+            parts.append(_run_text(child))
+        elif child.tag == _W_HYPERLINK:
+            parts.extend(_run_text(run) for run in child.iterfind(_W_R))
+    return "".join(parts)
+
+def _property_int(properties, tag: str, default: int) -> int:
+    """Returns the integer w:val of a child of a w:trPr/w:tcPr element."""
+    if properties is None:
+        return default
+    element = properties.find(tag)
+    if element is None:
+        return default
+    return int(element.get(_W_VAL, default))
+
+def iter_table_rows(tbl):
+    """Yields (grid_cols_before, cells, grid_cols_after) for each row of a w:tbl element.
+    
+    `cells` holds one w:tc element per layout-grid cell, matching python-docx's
+    _Row.cells: a horizontally spanned cell is repeated for each grid column it
+    covers, and a vertically merged cell resolves to the cell where the merge starts.
+    Works on the element directly, without creating any python-docx wrapper objects.
+    """
+    cells_above = {}
+    for tr in tbl.iterfind(_W_TR):
+        trPr = tr.find(_W_TRPR)
+        grid_before = _property_int(trPr, _W_GRID_BEFORE, 0)
+        grid_after = _property_int(trPr, _W_GRID_AFTER, 0)
+        
+        cells = []
+        row_cells = {}
+        grid_offset = grid_before
+        for tc in tr.iterfind(_W_TC):
+            tcPr = tc.find(_W_TCPR)
+            span = _property_int(tcPr, _W_GRID_SPAN, 1)
+            
+            # A vMerge without a value continues the merge started in a row above
+            vmerge = tcPr.find(_W_VMERGE) if tcPr is not None else None
+            if vmerge is not None and vmerge.get(_W_VAL, "continue") == "continue":
+                tc = cells_above.get(grid_offset, tc)
+            
+            row_cells[grid_offset] = tc
+            cells.extend([tc] * span)
+            grid_offset += span
+        
+        cells_above = row_cells
+        yield grid_before, cells, grid_after
+
+def body_tables(document) -> list:
+    """Returns the top-level w:tbl elements of a document body, indexed like document.tables.
+    
+    Unlike document.tables this does not create a Table object for every table, so
+    callers can wrap just the one they need.
+    """
+    return document.element.body.tbl_lst
+
+def body_paragraph(document, index: int):
+    """Returns the body paragraph at `index`, as document.paragraphs[index] would.
+    
+    Only the requested paragraph is wrapped in a Paragraph object. Returns None if
+    the index is out of range.
+    """
+    from docx.text.paragraph import Paragraph
+
+    p_lst = document.element.body.p_lst
+    if index < 0 or index >= len(p_lst):
+        return None
+    return Paragraph(p_lst[index], document._body)
+
+def cell_paragraph_texts(tc) -> list:
+    """Returns the text of each paragraph directly inside a w:tc element."""
+    return [paragraph_text(p) for p in tc.iterfind(_W_P)]
+
+def cell_has_nested_table(tc) -> bool:
+    """Returns True if a w:tc element directly contains a table."""
+    return tc.find(_W_TBL) is not None
+
+def iter_body_elements(doc_id: str):
+    """Yields each top-level element of the document body as soon as it is parsed.
+    
+    The document part is streamed with iterparse and each element is discarded once
+    the caller moves on to the next one, so the full tree is never held in memory
+    and nothing after the last element requested is parsed at all.
+    """
+    doc_path = get_document_path(doc_id)
+    try:
+        flush_pending_saves(doc_path)
+        with zipfile.ZipFile(doc_path) as package, package.open("word/document.xml") as part:
+            depth = 0
+            body = None
+            for event, element in ElementTree.iterparse(part, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2 and element.tag == _W_BODY:
+                        body = element
+                else:
+                    depth -= 1
+                    if depth == 2 and body is not None:
+                        yield element
+                        # Drop the finished body element
+                        body.clear()
+                    elif depth == 1 and element is body:
+                        body = None
+    except FileNotFoundError:
+        raise DocumentNotFoundError(doc_id)
+    except Exception as e:
+        raise ValueError(f"Error loading document '{doc_id}.docx': {str(e)}")
+
+def iter_paragraph_texts(doc_id: str, start: int = 0, stop: int = None):
+    """Yields the text of each body paragraph from index `start` up to `stop`.
+    
+    The document is streamed, so skipped paragraphs are never converted to text
+    and parsing ends as soon as paragraph `stop` is reached.
+    """
+    paragraphs = (element for element in iter_body_elements(doc_id) if element.tag == _W_P)
+    for paragraph in islice(paragraphs, start, stop):
+        yield paragraph_text(paragraph)
+
+def count_paragraphs(doc_id: str) -> int:
+    """Returns the number of body paragraphs, as len(document.paragraphs) would."""
+    return sum(1 for element in iter_body_elements(doc_id) if element.tag == _W_P)
+
+def _property_val(element, properties_tag: str, tag: str):
+    """Returns the w:val of a child of the properties element of `element`, or None."""
+    properties = element.find(properties_tag)
+    if properties is None:
+        return None
+    child = properties.find(tag)
+    return child.get(_W_VAL) if child is not None else None
+
+def _run_toggle(rPr, tag: str):
+    """Returns a run's tri-state toggle property (w:b, w:i), matching python-docx's Font."""
+    if rPr is None:
+        return None
+    element = rPr.find(tag)
+    if element is None:
+        return None
+    return element.get(_W_VAL, "true") in ("1", "true", "on")
+
+def read_style_table(doc_id: str) -> tuple:
+    """Returns the styles of a document as ({style_id: (type, name)}, {type: default name}).
+    
+    Types are the raw w:type values, or None for a style without one, which python-docx
+    never matches when looking a style up by id.
+    """
+    from docx.styles import BabelFish
+
+    try:
+        root = load_document_part(doc_id, "word/styles.xml")
+    except KeyError:
+        # No styles part; python-docx falls back to its default styles
+        root = load_document(doc_id, read_only=True).styles.element
+    
+    styles = {}
+    default_names = {}
+    for style in root.iterfind(_W_STYLE):
+        name = style.find(_W_NAME)
+        name = BabelFish.internal2ui(name.get(_W_VAL)) if name is not None else None
+        style_type = style.get(_W_TYPE)
+        # The first style with an id wins, the last default of a type wins
+        styles.setdefault(style.get(_W_STYLE_ID), (style_type, name))
+        if style.get(_W_DEFAULT) in ("1", "true", "on"):
+            default_names[style_type] = name
+    return styles, default_names
+
+def iter_document_structure(doc_id: str):
+    """Yields a summary of each top-level body element, streaming the document.
+    
+    Paragraphs are yielded as ("paragraph", text, style_name, runs), with one
+    (style_name, bold, italic, text) tuple per run. Tables are yielded as
+    ("table", style_name, rows), with rows as produced by iter_table_rows(); its
+    w:tc elements are only valid until the next item is requested. Values match
+    what the python-docx properties return, and a style name is "Default" where
+    python-docx would return no style at all.
+    """
+    styles, default_names = read_style_table(doc_id)
+    
+    def style_name(style_id, style_type):
+        # Unknown ids and styles of the wrong type resolve to the default for the type
+        style = styles.get(style_id) if style_id else None
+        if style is None or style[0] != style_type:
+            return default_names.get(style_type, "Default")
+        return style[1]
+    
+    for element in iter_body_elements(doc_id):
+        if element.tag == _W_P:
+            runs = []
+            for run in element.iterfind(_W_R):
+                rPr = run.find(_W_RPR)
+                run_style_id = rPr.find(_W_RSTYLE) if rPr is not None else None
+                if run_style_id is not None:
+                    run_style_id = run_style_id.get(_W_VAL)
+                runs.append((style_name(run_style_id, "character"), _run_toggle(rPr, _W_B),
+                             _run_toggle(rPr, _W_I), _run_text(run)))
+            yield ("paragraph", paragraph_text(element),
+                   style_name(_property_val(element, _W_PPR, _W_PSTYLE), "paragraph"), runs)
+        elif element.tag == _W_TBL:
+            yield ("table", style_name(_property_val(element, _W_TBLPR, _W_TBLSTYLE), "table"),
+                   list(iter_table_rows(element)))
+
+# Parsed style lists keyed by document path, reused while the file is unchanged
+_STYLES_CACHE = {}
+
+def read_styles(doc_id: str) -> tuple:
+    """Returns (name, WD_STYLE_TYPE) pairs for the styles defined in a document.
+    
+    The result is a read-only snapshot that is shared between calls until the
+    document file changes on disk.
+    """
+    doc_path = get_document_path(doc_id)
+    try:
+        flush_pending_saves(doc_path)
+        file_version = _file_version(doc_path)
+    except FileNotFoundError:
+        raise DocumentNotFoundError(doc_id)
+    
+    cached = _STYLES_CACHE.get(doc_path)
+    if cached is not None and cached[0] == file_version:
+        return cached[1]
+    
+    styles = _parse_styles(doc_id)
+    _STYLES_CACHE[doc_path] = (file_version, styles)
+    return styles
+
+def _parse_styles(doc_id: str) -> tuple:
+    """Reads the style names and types from the styles part of a document."""
+    from docx.styles import BabelFish
+
+    try:
+        root = load_document_part(doc_id, "word/styles.xml")
+    except KeyError:
+        # No styles part; python-docx falls back to its default styles
+        return tuple((style.name, style.type) for style in load_document(doc_id, read_only=True).styles)
+    
+    styles = []
+    for style in root.iterfind(_W_STYLE):
+        name = style.find(_W_NAME)
+        name = BabelFish.internal2ui(name.get(_W_VAL)) if name is not None else None
+        styles.append((name, STYLE_TYPES[style.get(_W_TYPE, "paragraph")]))
+    return tuple(styles)
+
 # Formatting helper functions
-def apply_paragraph_formatting(paragraph, formatting):
-    """Apply formatting to a paragraph."""
-    from docx.shared import Inches, Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
+def _line_spacing(value):
+    """Converts a line_spacing setting to a multiple or, failing that, a point value."""
+    try:
+        # Try as a float (multiple)
+        return float(value)
+    except ValueError:
+        # Try as a point value
+        return Pt(float(value))
+
+# Paragraph format properties set from a formatting dict, in the order they are
+# applied. Each key is also the ParagraphFormat attribute it sets.
+_PARAGRAPH_FORMAT_PROPERTIES = (
+    # Indentation, in inches
+    ("left_indent", lambda value: Inches(float(value))),
+    ("right_indent", lambda value: Inches(float(value))),
+    ("first_line_indent", lambda value: Inches(float(value))),
+    # Spacing, in points
+    ("space_before", lambda value: Pt(float(value))),
+    ("space_after", lambda value: Pt(float(value))),
+    ("line_spacing", _line_spacing),
+    # Pagination
+    ("keep_together", bool),
+    ("keep_with_next", bool),
+    ("page_break_before", bool),
+    ("widow_control", bool),
+)
 
+def apply_paragraph_format(para_format, formatting):
+    """Apply formatting to a ParagraphFormat, such as that of a paragraph or a style."""
     if not formatting:
         return
     
-    para_format = paragraph.paragraph_format
-    
     # Alignment
     alignment = formatting.get("alignment")
     if alignment:
-        alignment_map = {
-            "LEFT": WD_ALIGN_PARAGRAPH.LEFT,
-            "CENTER": WD_ALIGN_PARAGRAPH.CENTER,
-            "RIGHT": WD_ALIGN_PARAGRAPH.RIGHT,
-            "JUSTIFY": WD_ALIGN_PARAGRAPH.JUSTIFY
-        }
-        if alignment.upper() in alignment_map:
-            para_format.alignment = alignment_map[alignment.upper()]
-    
-    # Indentation
-    left_indent = formatting.get("left_indent")
-    if left_indent is not None:
-        para_format.left_indent = Inches(float(left_indent))
-    
-    right_indent = formatting.get("right_indent")
-    if right_indent is not None:
-        para_format.right_indent = Inches(float(right_indent))
-    
-    first_line_indent = formatting.get("first_line_indent")
-    if first_line_indent is not None:
-        para_format.first_line_indent = Inches(float(first_line_indent))
-    
-    # Spacing
-    space_before = formatting.get("space_before")
-    if space_before is not None:
-        para_format.space_before = Pt(float(space_before))
-    
-    space_after = formatting.get("space_after")
-    if space_after is not None:
-        para_format.space_after = Pt(float(space_after))
-    
-    # Line spacing
-    line_spacing = formatting.get("line_spacing")
-    if line_spacing is not None:
-        try:
-            # Try as a float (multiple)
-            spacing_float = float(line_spacing)
-            para_format.line_spacing = spacing_float
-        except ValueError:
-            # Try as a point value
-            para_format.line_spacing = Pt(float(line_spacing))
+        alignment_value = ALIGNMENT_MAP.get(alignment.upper())
+        if alignment_value is not None:
+            para_format.alignment = alignment_value
     
-    # Pagination
-    keep_together = formatting.get("keep_together")
-    if keep_together is not None:
-        para_format.keep_together = bool(keep_together)
-    
-    keep_with_next = formatting.get("keep_with_next")
-    if keep_with_next is not None:
-        para_format.keep_with_next = bool(keep_with_next)
+    for key, convert in _PARAGRAPH_FORMAT_PROPERTIES:
+        value = formatting.get(key)
+        if value is not None:
+            setattr(para_format, key, convert(value))
+
+def apply_paragraph_formatting(paragraph, formatting):
+    """Apply formatting to a paragraph."""
+    if not formatting:
+        return
     
-    page_break_before = formatting.get("page_break_before")
-    if page_break_before is not None:
-        para_format.page_break_before = bool(page_break_before)
+    apply_paragraph_format(paragraph.paragraph_format, formatting)
+
+@lru_cache(maxsize=256)
+def parse_color(color: str):
+    """Parses a '#RRGGBB' or 'rgb(r, g, b)' color string.
     
-    widow_control = formatting.get("widow_control")
-    if widow_control is not None:
-        para_format.widow_control = bool(widow_control)
+    Returns an RGBColor, or None if the string is in neither format. Raises
+    ValueError if it is in one of the formats but malformed. Results are memoized;
+    RGBColor is immutable, so the same instance is shared by every run using a color.
+    """
+    from docx.shared import RGBColor
+
+    if color.startswith('#'):
+        # Decode the six hex digits straight into the three channel bytes
+        match = _HEX_COLOR.match(color)
+        if match is None:
+            raise ValueError(f"Invalid hex color '{color}'. Expected #RRGGBB.")
+        return RGBColor(*bytes.fromhex(match.group(1)))
+    elif color.startswith('rgb('):
+        # Parse rgb() format with a single regex match
+        match = _RGB_COLOR.fullmatch(color)
+        if match is None:
+            raise ValueError(f"Invalid rgb color '{color}'. Expected rgb(r, g, b).")
+        return RGBColor(*map(int, match.groups()))
+    return None
+
+# Boolean run properties set from a formatting dict, with their w:rPr child tags
+_RUN_TOGGLE_PROPERTIES = (("bold", "b"), ("italic", "i"))
 
 def apply_run_formatting(run, formatting):
-    """Apply formatting to a run of text."""
-    from docx.shared import Pt, RGBColor
+    """Apply formatting to a run of text.
+    
+    The properties are written straight into the run's w:rPr element, which is looked
+    up (or created) once instead of once per property as the Font setters do.
+    """
+    from docx.enum.text import WD_UNDERLINE
 
     if not formatting:
         return
     
-    font = run.font
+    rPr = run._r.get_or_add_rPr()
     
     # Font name and size
     font_name = formatting.get("name")
     if font_name:
-        font.name = font_name
+        rPr.rFonts_ascii = font_name
+        rPr.rFonts_hAnsi = font_name
     
     font_size = formatting.get("size")
     if font_size is not None:
-        font.size = Pt(float(font_size))
+        rPr.sz_val = Pt(float(font_size))
     
     # Font styles
-    bold = formatting.get("bold")
-    if bold is not None:
-        font.bold = bool(bold)
-    
-    italic = formatting.get("italic")
-    if italic is not None:
-        font.italic = bool(italic)
+    for key, tag in _RUN_TOGGLE_PROPERTIES:
+        value = formatting.get(key)
+        if value is not None:
+            rPr._set_bool_val(tag, bool(value))
     
     underline = formatting.get("underline")
     if underline is not None:
-        font.underline = bool(underline)
+        rPr.u_val = WD_UNDERLINE.SINGLE if underline else WD_UNDERLINE.NONE
     
     # Font color
     color = formatting.get("color")
     if color:
-        if color.startswith('#'):
-            # Convert hex color to RGB
-            r = int(color[1:3], 16)
-            g = int(color[3:5], 16)
-            b = int(color[5:7], 16)
-            font.color.rgb = RGBColor(r, g, b)
-        elif color.startswith('rgb('):
-            # Parse rgb() format
-            rgb = color.strip('rgb()').split(',')
-            if len(rgb) == 3:
-                r = int(rgb[0].strip())
-                g = int(rgb[1].strip())
-                b = int(rgb[2].strip())
-                font.color.rgb = RGBColor(r, g, b)
+        rgb_color = parse_color(color)
+        if rgb_color is not None:
+            rPr._remove_color()
+            rPr.get_or_add_color().val = rgb_color
 
-def add_content_to_document(document, content):
-    """Helper function to add content to a document object."""
-    from docx.enum.style import WD_STYLE_TYPE
+def split_table_data(data: str) -> list:
+    """Splits comma-separated table data into stripped cell values.
+    
+    The data is always parsed as CSV. Values may be double-quoted to include commas
+    or line breaks. A line break outside quotes separates values just like a comma,
+    so data can be written one table row per line, and blank lines are skipped.
+    """
+    records = csv.reader(StringIO(data.strip(), newline=""), skipinitialspace=True)
+    return [value.strip() for record in records for value in record]
+
+def fill_table_cells(table, data_list):
+    """Fills a newly created table row-wise from a flat list of cell values.
+    
+    Cells beyond the end of data_list are left empty.
+    """
+    values = iter(data_list)
+    for tr in table._tbl.tr_lst:
+        # A fresh table has exactly one w:tc per column, each holding a single empty
+        # paragraph, so the text run is added to it directly. This skips both the
+        # _Row/_Cell/Paragraph wrappers and the clear-and-rebuild `cell.text` setter.
+        for tc, value in zip(tr.tc_lst, values):
+            if value:
+                tc.p_lst[0].add_r().text = value
+
+def _add_heading_item(document, item, has_style):
+    """Adds a "heading" content item."""
 
+    level = item.get("level", 1)
+    # Define the level's built-in heading style if the document lacks it; an
+    # unknown style is left for add_heading to report
+    heading_style = HEADING_STYLES.get(level)
+    if heading_style is not None:
+        has_style(heading_style, WD_STYLE_TYPE.PARAGRAPH)
+    
+    heading = document.add_heading(item.get("text", ""), level)
+    
+    # Apply formatting if provided
+    formatting = item.get("formatting", {})
+    if formatting:
+        apply_paragraph_formatting(heading, formatting)
+    return True
+
+def _add_paragraph_item(document, item, has_style):
+    """Adds a "paragraph" content item."""
+
+    style = item.get("style")
+    # Styles that are not defined in the document are left out
+    if style and not has_style(style, WD_STYLE_TYPE.PARAGRAPH):
+        style = None
+    
+    paragraph = document.add_paragraph(item.get("text", ""), style=style)
+    
+    # Apply formatting if provided
+    formatting = item.get("formatting", {})
+    if formatting:
+        apply_paragraph_formatting(paragraph, formatting)
+    
+    # Apply run formatting if provided
+    run_formatting = item.get("run_formatting", {})
+    if run_formatting and len(paragraph.runs) > 0:
+        apply_run_formatting(paragraph.runs[0], run_formatting)
+    return True
+
+def _add_table_item(document, item, has_style):
+    """Adds a "table" content item. Returns False if the data does not fit the table."""
+
+    rows = item.get("rows", 1)
+    cols = item.get("cols", 1)
+    data = item.get("data", "")
+    style = item.get("style")
+    
+    table = document.add_table(rows=rows, cols=cols)
+    
+    # Apply style if specified and defined in the document
+    if style and has_style(style, WD_STYLE_TYPE.TABLE):
+        table.style = style
+    
+    # Fill with data if provided
+    if data:
+        data_list = split_table_data(data)
+        
+        # Check if data fits the table dimensions (missing cells are left empty)
+        if len(data_list) > rows * cols:
+            return False
+        
+        # Fill table cells
+        fill_table_cells(table, data_list)
+    
+    # Process cell_formatting if provided
+    cell_formatting = item.get("cell_formatting", [])
+    for cell_format in cell_formatting:
+        row = cell_format.get("row", 0)
+        col = cell_format.get("col", 0)
+        formatting = cell_format.get("formatting", {})
+        
+        if row < rows and col < cols:
+            cell = table.cell(row, col)
+            if cell and len(cell.paragraphs) > 0:
+                apply_paragraph_formatting(cell.paragraphs[0], formatting)
+    return True
+
+# Handlers for each content item type accepted by add_content_to_document()
+_CONTENT_HANDLERS = {
+    "heading": _add_heading_item,
+    "paragraph": _add_paragraph_item,
+    "table": _add_table_item
+}
+
+def add_content_to_document(document, content):
+    """Helper function to add content to a document object.
+    
+    Items of an unknown type are skipped. Returns False if a table item has more
+    data than cells.
+    """
     if not content:
         return True
-        
+    
+    has_style = style_checker(document)
     for item in content:
-        content_type = item.get("type", "").lower()
-        text = item.get("text", "")
-        
-        if content_type == "heading":
-            level = item.get("level", 1)
-            heading = document.add_heading(text, level)
-            
-            # Apply formatting if provided
-            formatting = item.get("formatting", {})
-            if formatting:
-                apply_paragraph_formatting(heading, formatting)
-            
-        elif content_type == "paragraph":
-            style = item.get("style")
-            try:
-                # If style is specified, ensure it exists in the document
-                if style:
-                    style_exists_in_doc = False
-                    for doc_style in document.styles:
-                        if doc_style.name == style:
-                            style_exists_in_doc = True
-                            break
-                    
-                    # If style doesn't exist, it might be a built-in style that needs defining
-                    if not style_exists_in_doc:
-                        # Add temporary paragraph to define the style
-                        temp_para = document.add_paragraph("", style=style)
-                        # Remove the temporary paragraph
-                        p = temp_para._element
-                        p.getparent().remove(p)
-                
-                paragraph = document.add_paragraph(text, style=style if style else None)
-                
-                # Apply formatting if provided
-                formatting = item.get("formatting", {})
-                if formatting:
-                    apply_paragraph_formatting(paragraph, formatting)
-                
-                # Apply run formatting if provided
-                run_formatting = item.get("run_formatting", {})
-                if run_formatting and len(paragraph.runs) > 0:
-                    apply_run_formatting(paragraph.runs[0], run_formatting)
-                
-            except KeyError:
-                # Style not found, add without style
-                paragraph = document.add_paragraph(text)
-                
-        elif content_type == "table":
-            rows = item.get("rows", 1)
-            cols = item.get("cols", 1)
-            data = item.get("data", "")
-            style = item.get("style")
-            
-            table = document.add_table(rows=rows, cols=cols)
-            
-            # Apply style if specified
-            if style:
-                try:
-                    # If style doesn't exist, it might be a built-in style that needs defining
-                    style_exists_in_doc = False
-                    for doc_style in document.styles:
-                        if doc_style.name == style and doc_style.type == WD_STYLE_TYPE.TABLE:
-                            style_exists_in_doc = True
-                            break
-                    
-                    # If style doesn't exist, it might be a built-in style that needs defining
-                    if not style_exists_in_doc:
-                        # Add temporary table to define the style
-                        temp_table = document.add_table(rows=1, cols=1)
-                        temp_table.style = style
-                        # Remove the temporary table
-                        p = temp_table._element
-                        p.getparent().remove(p)
-                    
-                    table.style = style
-                except KeyError:
-                    pass  # Continue without style if not found
-            
-            # Fill with data if provided
-            if data:
-                data_list = data.split(',')
-                
-                # Pad with empty strings if too few data elements
-                if len(data_list) < rows * cols:
-                    data_list.extend([''] * (rows * cols - len(data_list)))
-                    
-                # Check if data matches table dimensions
-                if len(data_list) != rows * cols:
-                    return False
-                
-                # Fill table cells
-                for i in range(rows):
-                    for j in range(cols):
-                        cell_idx = i * cols + j
-                        if cell_idx < len(data_list):
-                            table.cell(i, j).text = data_list[cell_idx].strip()
-            
-            # Process cell_formatting if provided
-            cell_formatting = item.get("cell_formatting", [])
-            for cell_format in cell_formatting:
-                row = cell_format.get("row", 0)
-                col = cell_format.get("col", 0)
-                formatting = cell_format.get("formatting", {})
-                
-                if row < rows and col < cols:
-                    cell = table.cell(row, col)
-                    if cell and len(cell.paragraphs) > 0:
-                        apply_paragraph_formatting(cell.paragraphs[0], formatting)
+        handler = _CONTENT_HANDLERS.get(item.get("type", "").lower())
+        if handler is not None and not handler(document, item, has_style):
+            return False
     
     return True
 
+def style_names(document, style_type=None) -> set:
+    """Returns the names of the styles defined in a document.
+    
+    The names are read from the styles element with a single XPath query, without
+    creating a python-docx style object per style.
+    
+    Args:
+        document: The python-docx Document.
+        style_type (WD_STYLE_TYPE, optional): Only return styles of this type.
+    """
+    from docx.styles import BabelFish
+
+    if style_type is None:
+        query = "w:style/w:name/@w:val"
+    elif style_type == WD_STYLE_TYPE.PARAGRAPH:
+        # A style without a w:type is a paragraph style
+        query = "w:style[not(@w:type) or @w:type='paragraph']/w:name/@w:val"
+    else:
+        query = f"w:style[@w:type='{style_type.xml_value}']/w:name/@w:val"
+    return {BabelFish.internal2ui(name) for name in document.styles.element.xpath(query)}
+
 def style_exists(document, style_name, style_type):
     """Checks if a style exists in the document."""
-    for style in document.styles:
-        if style.name == style_name and style.type == style_type:
-            return True
-    return False
+    return style_name in style_names(document, style_type)
+
+@lru_cache(maxsize=1)
+def _template_styles():
+    """Returns the styles element of python-docx's default template, parsed once."""
+    return Document().styles.element
+
+def define_builtin_style(document, style_name, style_type) -> bool:
+    """Adds a built-in Word style that the document does not define yet.
+    
+    The definition is copied from python-docx's default template, which holds Word's
+    own definitions of the common built-in styles, so the style keeps its real type,
+    base style and formatting. Returns False, leaving the document unchanged, if the
+    template has no style of that name and type, or the name or style ID is already
+    used in the document.
+    """
+    from docx.styles import BabelFish
+
+    styles_element = document.styles.element
+    internal_name = BabelFish.ui2internal(style_name)
+    template_style = _template_styles().get_by_name(internal_name)
+    if template_style is None or template_style.type != style_type:
+        return False
+    if (styles_element.get_by_name(internal_name) is not None
+            or styles_element.get_by_id(template_style.styleId) is not None):
+        return False
+    _copy_template_style(styles_element, template_style)
+    return True
+
+def _copy_template_style(styles_element, template_style) -> None:
+    """Copies a template style into a styles element, with the styles it is based on
+    or linked to that the document does not define.
+    """
+    styles_element.append(deepcopy(template_style))
+    for style_id in template_style.xpath("w:basedOn/@w:val | w:link/@w:val"):
+        related = _template_styles().get_by_id(style_id)
+        if related is not None and styles_element.get_by_id(style_id) is None:
+            _copy_template_style(styles_element, related)
+
+def style_checker(document):
+    """Returns a has_style(style_name, style_type) function for adding many items.
+    
+    The style names defined in the document are read once per style type. A built-in
+    style the document lacks is defined on first use and added to the set, so every
+    later check for it is a set lookup.
+    """
+    defined_styles = {}
+    
+    def has_style(style_name, style_type):
+        if style_type not in defined_styles:
+            defined_styles[style_type] = style_names(document, style_type)
+        names = defined_styles[style_type]
+        if style_name not in names and define_builtin_style(document, style_name, style_type):
+            names.add(style_name)
+        return style_name in names
+    
+    return has_style
+
+def ensure_style_defined(document, style_name, style_type) -> bool:
+    """Checks that a style is defined in the document, defining it if it is built in."""
+    return style_name in style_names(document, style_type) or define_builtin_style(document, style_name, style_type)
@@ -0,0 +1,156 @@
+"""
+Tests for debounced saves, editing sessions and rollback of failed edits.
+"""
+
+import time
+
+import pytest
+from docx import Document
+
+import mcp_docx_server.utils as utils
+from mcp_docx_server.content_ops import add_paragraph, add_table
+from mcp_docx_server.document_ops import (
+    create_document, flush_document_changes, open_document, close_document
+)
+
+
+@pytest.fixture
+def writes(tmp_path, monkeypatch):
+    """Points the server at an empty documents directory and records every file write."""
+    monkeypatch.setattr(utils, "DOCUMENTS_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "_DOCUMENT_PATH_PREFIX", str(tmp_path) + "/")
+    utils.get_document_path.cache_clear()
+
+    written = []
+    write_package = utils._write_package
+
+    def recording_write(data, doc_path):
+        write_package(data, doc_path)
+        written.append(doc_path)
+
+    monkeypatch.setattr(utils, "_write_package", recording_write)
+    yield written
+
+    with utils._SAVE_LOCK:
+        for pending in utils._PENDING_SAVES.values():
+            if pending[2] is not None:
+                pending[2].cancel()
+        utils._PENDING_SAVES.clear()
+        utils._OPEN_SESSIONS.clear()
+        utils._SAVE_ERRORS.clear()
+        utils._DOCUMENT_CACHE.clear()
+    utils.get_document_path.cache_clear()
+
+
+def on_disk(doc_id):
+    """Parses a document straight from its file, bypassing the server's caches."""
+    return Document(utils.get_document_path(doc_id))
+
+
+def paragraph_texts(doc_id):
+    return [paragraph.text for paragraph in on_disk(doc_id).paragraphs]
+
+
+def fail_writes(monkeypatch, message="disk full"):
+    def failing_write(data, doc_path):
+        raise OSError(message)
+
+    monkeypatch.setattr(utils, "_write_package", failing_write)
+
+
+def test_burst_of_edits_is_written_once(writes):
+    assert "created successfully" in create_document("a", "Title")
+    assert len(writes) == 1
+
+    for i in range(5):
+        assert add_paragraph("a", f"p{i}") == "Paragraph added successfully."
+    assert len(writes) == 1
+
+    deadline = time.monotonic() + 5
+    while len(writes) == 1 and time.monotonic() < deadline:
+        time.sleep(utils._SAVE_DELAY)
+    assert len(writes) == 2
+    assert paragraph_texts("a") == ["Title", "p0", "p1", "p2", "p3", "p4"]
+
+
+def test_failed_tool_leaves_no_partial_change(writes):
+    create_document("a", "Title")
+    add_paragraph("a", "p")
+
+    result = add_table("a", 1, 1, "x,y,z")
+    assert result.startswith("Error: Number of data elements")
+
+    add_paragraph("a", "q")
+    assert flush_document_changes() == "Saved pending changes to 1 document(s)."
+    document = on_disk("a")
+    assert document.tables == []
+    assert [paragraph.text for paragraph in document.paragraphs] == ["Title", "p", "q"]
+
+
+def test_write_failure_is_reported_once_by_next_edit(writes, monkeypatch):
+    create_document("a", "Title")
+    add_paragraph("a", "lost")
+
+    write_package = utils._write_package
+    fail_writes(monkeypatch)
+    assert utils.flush_pending_saves() == 0
+    monkeypatch.setattr(utils, "_write_package", write_package)
+
+    result = add_paragraph("a", "next")
+    assert "Error saving document 'a.docx': disk full" in result
+    assert add_paragraph("a", "next") == "Paragraph added successfully."
+    flush_document_changes()
+    assert paragraph_texts("a") == ["Title", "next"]
+
+
+def test_write_failure_is_reported_by_flush_and_other_documents_are_written(writes, monkeypatch):
+    create_document("a", "A")
+    create_document("b", "B")
+    add_paragraph("a", "pa")
+    add_paragraph("b", "pb")
+
+    write_package = utils._write_package
+
+    def fail_for_a(data, doc_path):
+        if doc_path.endswith("a.docx"):
+            raise OSError("disk full")
+        write_package(data, doc_path)
+
+    monkeypatch.setattr(utils, "_write_package", fail_for_a)
+    result = flush_document_changes()
+    assert result.startswith("Error saving document changes: Saved 1 document(s)")
+    assert "a.docx: disk full" in result
+    assert paragraph_texts("b") == ["B", "pb"]
+
+    # Reported once: neither a later flush nor the next edit repeats it
+    assert flush_document_changes() == "No pending document changes to save."
+    assert add_paragraph("a", "again") == "Paragraph added successfully."
+
+
+def test_session_is_written_only_on_close(writes):
+    create_document("a", "Title")
+    assert "opened" in open_document("a")
+
+    add_paragraph("a", "p1")
+    add_table("a", 1, 1, "x,y,z")
+    add_paragraph("a", "p2")
+    time.sleep(utils._SAVE_DELAY * 3)
+    assert len(writes) == 1
+    assert paragraph_texts("a") == ["Title"]
+
+    assert close_document("a") == "Document 'a.docx' closed and saved."
+    assert len(writes) == 2
+    document = on_disk("a")
+    assert document.tables == []
+    assert [paragraph.text for paragraph in document.paragraphs] == ["Title", "p1", "p2"]
+
+
+def test_session_is_written_by_flush(writes):
+    create_document("a", "Title")
+    open_document("a")
+    add_paragraph("a", "p1")
+
+    assert flush_document_changes() == "Saved pending changes to 1 document(s)."
+    assert paragraph_texts("a") == ["Title", "p1"]
+    assert close_document("a") == "Document 'a.docx' closed and saved."
+    assert len(writes) == 2